@@ -1,14 +1,64 @@
 import streamlit as st
-import requests
-from typing import List, Optional, Dict, Any, Tuple
-from datetime import datetime, date
+from typing import List, Optional, Dict, Any, Tuple, Iterator, Callable
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, date, timedelta
+from functools import lru_cache
 import base64
+import collections
+import gc
+import hashlib
+import hmac
+import io
+import math
+import os
 import random
+import threading
+import time
 
 # --- Configuração da Página ---
 st.set_page_config(page_title="Lotofácil 2026", layout="centered")
 st.write("Feito por: Lucas Nascentes")
 
+# --- TELA INICIAL DE SELEÇÃO DE TEMA ---
+# Fica antes das dependências pesadas e das definições: a primeira pintura não
+# paga import de numpy/requests nem a montagem do CSS.
+if "tema_selecionado" not in st.session_state:
+    st.session_state["tema_selecionado"] = None
+
+if st.session_state["tema_selecionado"] is None:
+    st.markdown(
+        """
+        <div style="text-align: center; padding: 2rem;">
+          <h1>🎯 Lotofácil 2026</h1>
+          <p style="font-size: 1.2rem; margin: 1rem 0;">Qual aparência você deseja usar?</p>
+        </div>
+        """,
+        unsafe_allow_html=True,
+    )
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("☀️ Claro", type="primary", use_container_width=True):
+            st.session_state["tema_selecionado"] = "Claro"
+            st.rerun()
+    with col2:
+        if st.button("🌙 Escuro", type="primary", use_container_width=True):
+            st.session_state["tema_selecionado"] = "Escuro"
+            st.rerun()
+
+    st.stop()
+
+# --- Dependências pesadas (só depois que o tema foi escolhido) ---
+import numpy as np  # noqa: E402
+import requests  # noqa: E402
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait  # noqa: E402
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx  # noqa: E402
+from combinacoes import IndiceCombinacoes, Restricoes, SorteiosOcorridos, melhores_jogos  # noqa: E402
+from exportacao import FORMATOS_EXPORTACAO, Coluna, exportar_para_bytes  # noqa: E402
+from perfil import PerfilExecucao  # noqa: E402
+from snapshot import SnapshotInvalido, carregar_snapshot, exportar_snapshot, frequencia_acumulada  # noqa: E402
+
 # Cálculo do primeiro dia do mês atual
 PRIMEIRO_DIA_MES = date.today().replace(day=1)
 
@@ -27,362 +77,241 @@ EXTRA_GAMES: List[List[int]] = [
 ]
 
 BASE_URLS: List[str] = [
-    "https://servicebus2.caixa.gov.br/portaldeloterias/api/lotofacil",
-    "https://www.caixa.gov.br/loterias/_cache/webapi/lotofacil",
+    u.strip()
+    for u in os.environ.get(
+        "LOTOFACIL_BASE_URLS",  # ex.: stub local do teste de carga (separados por vírgula)
+        "https://servicebus2.caixa.gov.br/portaldeloterias/api/lotofacil,"
+        "https://www.caixa.gov.br/loterias/_cache/webapi/lotofacil",
+    ).split(",")
+    if u.strip()
 ]
 
+# Primeiro sorteio da Lotofácil (modo "todo o histórico")
+DATA_PRIMEIRO_CONCURSO = date(2003, 9, 29)
+INTERVALO_ATUALIZACAO_TELA_S = 0.2
+
+# Limitação de taxa das requisições à Caixa (compartilhada entre sessões)
+TAXA_INICIAL_REQ_S = 4.0
+TAXA_MINIMA_REQ_S = 0.5
+TAXA_MAXIMA_REQ_S = 12.0
+CONCORRENCIA_INICIAL = 3
+CONCORRENCIA_MAXIMA = 8
+LATENCIA_ALVO_S = 1.5
+PAUSA_BLOQUEIO_S = 5.0
+# Por quanto tempo um bloqueio da Caixa ainda é mostrado como aviso
+JANELA_AVISO_BLOQUEIO_S = 600
+TENTATIVAS_BLOQUEIO = 3
+STATUS_BLOQUEIO = (403, 429)
+# Espelhos (BASE_URLS): latência recente de cada um e "hedge" no p95 do primário
+JANELA_LATENCIA_ESPELHO = 50
+ALFA_LATENCIA_ESPELHO = 0.3  # média móvel exponencial usada para escolher o primário
+AMOSTRAS_MINIMAS_P95 = 5
+ATRASO_HEDGE_PADRAO_S = 1.0
+ATRASO_HEDGE_MINIMO_S = 0.2
+FALHAS_PARA_ISOLAR_ESPELHO = 3
+QUARENTENA_ESPELHO_S = 30.0
+# Concursos que falharam numa busca: nova tentativa em segundo plano, com espera exponencial
+ESPERA_REPOSICAO_INICIAL_S = 2.0
+ESPERA_REPOSICAO_MAXIMA_S = 300.0
+TENTATIVAS_REPOSICAO = 8
+
+# Widgets das seções recolhíveis (Histórico e Sugestão), preservados com a seção fechada
+WIDGETS_HISTORICO = (
+    "hist_tudo",
+    "hist_ini",
+    "hist_fim",
+    "hist_extras_multiselect",
+    "hist_formato",
+    "hist_premios_faixa",
+)
+WIDGETS_SUGESTAO = (
+    "analise_tudo",
+    "analise_ini",
+    "analise_fim",
+    "analise_qtd_dezenas",
+    "analise_formato",
+    "analise_premios_faixa",
+    "filtro_impares",
+    "filtro_moldura",
+    "filtro_repetidas",
+    "filtro_soma",
+    "filtro_primos",
+    "filtro_qtd",
+    "filtro_ineditos",
+)
+
+# Perfil sob demanda, só com ?admin= (?perfil=1 ou painel de administração)
+INTERVALO_AMOSTRAGEM_PERFIL_S = 0.005
+PERFIS_GUARDADOS = 5
+FUNCOES_PERFILADAS = (
+    "buscar_concurso",
+    "_buscar_resultado_caixa",
+    "_get_limitado",
+    "parse_data_concurso",
+    "extrair_dezenas_sorteadas",
+    "total_por_grupo",
+    "iterar_concursos_desc",
+    "frequencia_pelo_indice",
+    "executar_busca_historico",
+    "executar_analise",
+    "exibir_conferencia_de_jogos",
+    "chips_html",
+    "cartao_jogo_html",
+    "render_cartoes",
+    "aplicar_tema_visual",
+)
+
+# Histórico binário: um registro de largura fixa por concurso, lido via mmap
+DIR_DADOS = os.environ.get("LOTOFACIL_DADOS", ".dados")
+ARQUIVO_HISTORICO = "historico_v2.npy"
+LOTE_GRAVACAO_HISTORICO = 50
+# Windows: substituir o arquivo falha enquanto alguma sessão ainda o tem mapeado
+TENTATIVAS_SUBSTITUIR_HISTORICO = 20
+# Exportação: linhas por lote entregue ao escritor (a memória não cresce com o período)
+LINHAS_POR_LOTE_EXPORTACAO = 20_000
+# Histórico: acima disso, resumo por mês numa tabela em vez de um card por dia
+DIAS_MAXIMOS_EM_CARTOES = 31
+# Snapshot "quente" (histórico + índices) embutido na imagem ou montado como volume
+CAMINHO_SNAPSHOT = os.environ.get("LOTOFACIL_SNAPSHOT", os.path.join("snapshot", "lotofacil-snapshot.zip"))
+# Painel de administração: abre só com ?admin=<token>; sem token configurado, fica desligado
+TOKEN_ADMIN = os.environ.get("LOTOFACIL_ADMIN_TOKEN", "")
+FAIXAS = 5  # faixa 1 = 15 acertos ... faixa 5 = 11 acertos
+# Evolução dos prêmios: mês a mês, ou ano a ano a partir de 3 anos de período
+MESES_MAXIMOS_SERIE_PREMIOS = 36
+ORDINAL_1970 = date(1970, 1, 1).toordinal()
+DTYPE_HISTORICO = np.dtype([
+    ("numero", "<u4"),
+    ("data", "<u4"),  # date.toordinal()
+    ("mascara", "<u4"),  # bit (d - 1) ligado para cada dezena sorteada
+    ("premio", "<f8", (FAIXAS,)),  # valorPremio por faixa
+    ("ganhadores", "<u4", (FAIXAS,)),  # numeroDeGanhadores por faixa
+])
+
+# Preço da aposta simples (15 dezenas); com k dezenas custa C(k, 15) apostas
+VALOR_APOSTA_SIMPLES = 3.50
+
 # Custo dos extras (3 jogos x R$ 3,50)
-VALOR_JOGO_EXTRA = 3.50
+VALOR_JOGO_EXTRA = VALOR_APOSTA_SIMPLES
 QTD_JOGOS_EXTRAS_DIA = 3
 
 
 # --- Visual (CSS) ---
-def aplicar_tema_visual(modo: str):
+# CSS e imagens ficam em static/ (servidos em app/static/ com server.enableStaticServing):
+# o navegador baixa uma vez e guarda em cache, em vez de recebê-los a cada rerun.
+DIR_ESTATICO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+CSS_COMUM = "lotofacil.css"
+CSS_TEMA = {"Claro": "tema-claro.css", "Escuro": "tema-escuro.css"}
+
+VARIANTES_CHIP = {
+    "default": "chip",
+    "ok": "chip chip--ok",
+    "bad": "chip chip--bad",
+    "muted": "chip chip--muted",
+    "combinado": "chip chip--combinado",
+    "jogos-mais": "chip chip--jogos-mais",
+    "jogos-menos": "chip chip--jogos-menos",
+}
+
+
+@lru_cache(maxsize=None)
+def _ler_estatico(nome: str) -> bytes:
+    with open(os.path.join(DIR_ESTATICO, nome), "rb") as f:
+        return f.read()
+
+
+@lru_cache(maxsize=None)
+def url_estatico(nome: str) -> str:
     """
-    modo: "Claro" ou "Escuro"
+    URL do arquivo de static/ com a versão (hash do conteúdo) na query: muda
+    o arquivo, muda a URL, e o cache do navegador não serve a versão antiga.
     """
+    versao = hashlib.sha256(_ler_estatico(nome)).hexdigest()[:12]
+    return f"app/static/{nome}?v={versao}"
 
-    light_vars = """
-      :root{
-        --max: 980px;
-        --space-1: 8px;
-        --space-2: 12px;
-        --space-3: 16px;
-        --space-4: 20px;
-        --space-5: 24px;
-        --radius-1: 12px;
-        --radius-2: 16px;
 
-        --blue: #1F5AFF;
-        --blue-border: rgba(31,90,255,0.16);
+def servindo_estaticos() -> bool:
+    return bool(st.get_option("server.enableStaticServing"))
 
-        --text: rgba(15,23,42,0.92);
-        --muted: rgba(15,23,42,0.70);
 
-        --card-bg: rgba(2, 6, 23, 0.02);
+def aplicar_tema_visual(modo: str):
+    """
+    modo: "Claro" ou "Escuro"
+    """
+    arquivos = (CSS_COMUM, CSS_TEMA[modo])
+    if servindo_estaticos():
+        html = "".join(f'<link rel="stylesheet" href="{url_estatico(nome)}">' for nome in arquivos)
+    else:
+        # Sem static serving (ex.: config.toml de outro diretório): CSS embutido a cada rerun
+        html = "<style>" + "\n".join(_ler_estatico(nome).decode("utf-8") for nome in arquivos) + "</style>"
+    st.markdown(html, unsafe_allow_html=True)
 
-        --chip-bg: rgba(31,90,255,0.07);
-        --chip-border: rgba(31,90,255,0.20);
 
-        --chip-muted-bg: rgba(148,163,184,0.12);
-        --chip-muted-border: rgba(148,163,184,0.35);
-        --chip-muted-text: #334155;
+@lru_cache(maxsize=None)
+def img_to_data_uri(nome: str) -> str:
+    b64 = base64.b64encode(_ler_estatico(nome)).decode("utf-8")
+    ext = nome.split(".")[-1].lower()
+    mime = "image/png" if ext == "png" else "image/jpeg"
+    return f"data:{mime};base64,{b64}"
 
-        --chip-ok-bg: rgba(16,185,129,0.10);
-        --chip-ok-border: rgba(16,185,129,0.25);
-        --chip-ok-text: #059669;
 
-        --header-grad-a: rgba(31,90,255,0.14);
-        --header-grad-b: rgba(31,90,255,0.03);
-        --header-splash: rgba(31,90,255,0.34);
-        --header-caption: rgba(15, 23, 42, 0.62);
-      }
-    """
+def src_imagem(nome: str) -> str:
+    return url_estatico(nome) if servindo_estaticos() else img_to_data_uri(nome)
 
-    dark_vars = """
-      :root{
-        --max: 980px;
-        --space-1: 8px;
-        --space-2: 12px;
-        --space-3: 16px;
-        --space-4: 20px;
-        --space-5: 24px;
-        --radius-1: 12px;
-        --radius-2: 16px;
 
-        --blue: #7AA2FF;
-        --blue-border: rgba(122,162,255,0.22);
+def chips_html(nums: List[int], variant: str = "default") -> str:
+    cls = VARIANTES_CHIP[variant]
+    return '<div class="chip-wrap">' + "".join(f'<span class="{cls}">{n:02d}</span>' for n in nums) + "</div>"
 
-        --text: rgba(241,245,249,0.94);
-        --muted: rgba(226,232,240,0.72);
 
-        --card-bg: rgba(255,255,255,0.05);
+def chips_com_acertos_html(nums: List[int], acertos_set: set) -> str:
+    return '<div class="chip-wrap">' + "".join(
+        f'<span class="{VARIANTES_CHIP["ok" if n in acertos_set else "muted"]}">{n:02d}</span>' for n in nums
+    ) + "</div>"
 
-        --chip-bg: rgba(122,162,255,0.12);
-        --chip-border: rgba(122,162,255,0.30);
 
-        --chip-muted-bg: rgba(148,163,184,0.10);
-        --chip-muted-border: rgba(148,163,184,0.26);
-        --chip-muted-text: rgba(241,245,249,0.86);
+def render_chips(nums: List[int], variant: str = "default"):
+    st.markdown(chips_html(nums, variant), unsafe_allow_html=True)
 
-        --chip-ok-bg: rgba(16,185,129,0.18);
-        --chip-ok-border: rgba(16,185,129,0.36);
-        --chip-ok-text: rgba(167,243,208,0.96);
 
-        --header-grad-a: rgba(122,162,255,0.18);
-        --header-grad-b: rgba(122,162,255,0.04);
-        --header-splash: rgba(122,162,255,0.40);
-        --header-caption: rgba(226,232,240,0.76);
-      }
+def cartao_jogo_html(
+        titulo: str,
+        chips: str,
+        notas: Optional[List[str]] = None,
+        estatisticas: Optional[List[Tuple[str, str]]] = None,
+        rotulo_chips: Optional[str] = None,
+) -> str:
+    """
+    Um jogo em HTML: título, estatísticas (rótulo, valor já formatado ou HTML),
+    chips e notas em texto miúdo. Tudo numa linha só, para o Markdown não
+    confundir indentação com bloco de código.
+    """
+    partes = [f'<div class="jogo-card"><h3>{titulo}</h3>']
+    if estatisticas:
+        partes.append('<div class="jogo-stats">')
+        partes += [
+            f'<div class="jogo-stat"><div class="rotulo">{rotulo}</div><div class="valor">{valor}</div></div>'
+            for rotulo, valor in estatisticas
+        ]
+        partes.append("</div>")
+    if rotulo_chips:
+        partes.append(f'<div class="jogo-rotulo">{rotulo_chips}</div>')
+    partes.append(chips)
+    partes += [f'<p class="jogo-nota">{nota}</p>' for nota in notas or [] if nota]
+    partes.append("</div>")
+    return "".join(partes)
+
+
+def render_cartoes(cartoes: List[str], colunas: int = 1):
+    """
+    Todos os cartões de uma seção num único elemento (um st.markdown por seção,
+    não um por jogo).
     """
-
-    if modo == "Escuro":
-        vars_css = dark_vars
-        force_page = """
-          body, .stApp{
-            background: #0b1220 !important;
-            color: var(--text) !important;
-          }
-        """
-    else:  # "Claro"
-        vars_css = light_vars
-        force_page = """
-          body, .stApp{
-            background: #ffffff !important;
-            color: var(--text) !important;
-          }
-        """
-
-    st.markdown(
-        f"""
-        <style>
-          {vars_css}
-
-          .block-container{{
-            padding-top: 1.1rem;
-            padding-bottom: 2rem;
-            max-width: var(--max);
-            display: flex;
-            flex-direction: column;
-            align-items: center;
-          }}
-
-          {force_page}
-
-          /* Centralização GERAL */
-          .stMarkdown, .stMarkdown p, .stMarkdown span, .stText, label, div, p, h1, h2, h3, h4, h5, h6 {{
-            color: var(--text);
-            text-align: center !important;
-          }}
-
-          .stCaption, .stCaption p {{
-            color: var(--muted) !important;
-            text-align: center !important;
-          }}
-
-          .stNumberInput label, .stDateInput label {{
-             width: 100%;
-          }}
-          div[data-testid="stNumberInput"], div[data-testid="stDateInput"] {{
-              width: 100%;
-              display: flex;
-              flex-direction: column;
-              align-items: center;
-          }}
-
-          /* HEADER */
-          #lf-header{{
-            position: relative;
-            overflow: hidden;
-            padding: var(--space-4) var(--space-4);
-            border-radius: var(--radius-2);
-            background: linear-gradient(135deg, var(--header-grad-a), var(--header-grad-b));
-            border: 1px solid var(--blue-border);
-            margin-bottom: var(--space-3);
-            text-align: center;
-            width: 100%;
-          }}
-          #lf-header::before{{
-            content:"";
-            position:absolute;
-            top:-85px;
-            right:-85px;
-            width: 260px;
-            height: 260px;
-            background: radial-gradient(circle at 35% 35%, var(--header-splash), rgba(0,0,0,0) 70%);
-            transform: rotate(12deg);
-          }}
-          #lf-header .title{{
-            font-size: 1.75rem;
-            font-weight: 850;
-            margin: 0;
-            letter-spacing: -0.6px;
-            color: var(--text);
-          }}
-          #lf-header .subtitle{{
-            margin: 6px 0 0 0;
-            font-size: 0.98rem;
-            color: var(--blue);
-            font-weight: 650;
-          }}
-          #lf-header .caption{{
-            margin-top: 6px;
-            color: var(--header-caption);
-            font-size: 0.92rem;
-          }}
-
-          /* Botões */
-          div.stButton > button{{
-            border-radius: var(--radius-1);
-            padding: 0.55rem 1rem;
-            font-weight: 650;
-          }}
-          div.stButton {{
-            display: flex;
-            justify-content: center;
-          }}
-
-          /* Chips (Bolinhas) - AUMENTADAS */
-          .chip-wrap{{ 
-              display:flex; 
-              flex-wrap:wrap; 
-              gap: 12px; 
-              margin: 20px 0; 
-              justify-content: center; 
-          }}
-          .chip{{
-            width:50px; height:50px;
-            border-radius:999px;
-            display:inline-flex;
-            align-items:center;
-            justify-content:center;
-            font-weight:750;
-            font-size:16px;
-            user-select:none;
-            border:1px solid var(--chip-border);
-            background: var(--chip-bg);
-            color: var(--blue);
-            box-shadow: 0 2px 4px rgba(0,0,0,0.05);
-          }}
-
-          /* CORES DOS CHIPS */
-          .chip--ok{{
-            border:1px solid rgba(16,185,129,0.4);
-            background: rgba(16,185,129,0.15);
-            color: #059669;
-          }}
-          .stApp[data-theme="dark"] .chip--ok {{
-             color: #6ee7b7;
-          }}
-
-          .chip--bad{{
-            border:1px solid rgba(239, 68, 68, 0.4);
-            background: rgba(239, 68, 68,0.15);
-            color: #b91c1c;
-          }}
-          .stApp[data-theme="dark"] .chip--bad {{
-             color: #fca5a5;
-          }}
-
-          .chip--muted{{
-            border:1px solid var(--chip-muted-border);
-            background: var(--chip-muted-bg);
-            color: var(--chip-muted-text);
-          }}
-
-          /* CORES DOS CHIPS - COMBINADO (AMARELO) */
-          .chip--combinado{{
-            border:1px solid rgba(234, 179, 8, 0.4);
-            background: rgba(234, 179, 8, 0.15);
-            color: #ca8a04;
-          }}
-          .stApp[data-theme="dark"] .chip--combinado {{
-             color: #fde047;
-          }}
-
-          /* CORES DOS CHIPS - Jogos 16/9 */
-          .chip--jogos-mais{{
-            border:1px solid rgba(59, 130, 246, 0.4);
-            background: rgba(59, 130, 246, 0.15);
-            color: #1d4ed8;
-          }}
-          .stApp[data-theme="dark"] .chip--jogos-mais {{
-             color: #93c5fd;
-          }}
-
-          .chip--jogos-menos{{
-            border:1px solid rgba(249, 115, 22, 0.4);
-            background: rgba(249, 115, 22, 0.15);
-            color: #ea580c;
-          }}
-          .stApp[data-theme="dark"] .chip--jogos-menos {{
-             color: #fdba74;
-          }}
-
-          /* Métricas */
-          [data-testid="stMetric"]{{
-            background: var(--card-bg);
-            padding: var(--space-3);
-            border-radius: var(--radius-1);
-            display: flex;
-            flex-direction: column;
-            align-items: center;
-            justify-content: center;
-          }}
-          [data-testid="stMetricLabel"] {{
-             width: 100%;
-             justify-content: center;
-          }}
-          [data-testid="stMetricValue"] {{
-             width: 100%;
-             text-align: center;
-          }}
-
-          hr{{ margin: 1.5rem 0; opacity: 0.55; }}
-        </style>
-        """,
-        unsafe_allow_html=True,
-    )
-
     st.markdown(
-        """
-        <style>
-          /* Centralizador para imagens status (certo/errado) */
-          .status-wrap{
-            width: 100%;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-          }
-          .status-img{
-            width: 60px;
-            height: auto;
-            display: block;
-          }
-        </style>
-        """,
+        f'<div class="jogos-grade jogos-grade--{colunas}">' + "".join(cartoes) + "</div>",
         unsafe_allow_html=True,
     )
 
 
-def img_to_data_uri(path: str) -> str:
-    with open(path, "rb") as f:
-        b64 = base64.b64encode(f.read()).decode("utf-8")
-    ext = path.split(".")[-1].lower()
-    mime = "image/png" if ext == "png" else "image/jpeg"
-    return f"data:{mime};base64,{b64}"
-
-
-def render_chips(nums: List[int], variant: str = "default"):
-    cls = "chip"
-    if variant == "ok":
-        cls += " chip--ok"
-    elif variant == "bad":
-        cls += " chip--bad"
-    elif variant == "muted":
-        cls += " chip--muted"
-    elif variant == "combinado":
-        cls += " chip--combinado"
-    elif variant == "jogos-mais":
-        cls += " chip--jogos-mais"
-    elif variant == "jogos-menos":
-        cls += " chip--jogos-menos"
-
-    html = '<div class="chip-wrap">' + "".join(
-        f'<span class="{cls}">{n:02d}</span>' for n in nums
-    ) + "</div>"
-    st.markdown(html, unsafe_allow_html=True)
-
-
-def render_chips_com_acertos(nums: List[int], acertos_set: set):
-    html_parts = ['<div class="chip-wrap">']
-    for n in nums:
-        cls = "chip chip--ok" if n in acertos_set else "chip chip--muted"
-        html_parts.append(f'<span class="{cls}">{n:02d}</span>')
-    html_parts.append("</div>")
-    st.markdown("".join(html_parts), unsafe_allow_html=True)
-
-
 # --- Utilitários ---
 def formatar_moeda_br(valor: float) -> str:
     cent = int(round(float(valor) * 100))
@@ -417,32 +346,345 @@ def _is_json_response(resp: requests.Response) -> bool:
     return "json" in content_type
 
 
-@st.cache_data(ttl=3600)
-def buscar_resultado(concurso: Optional[int]) -> Dict[str, Any]:
-    last_error: Optional[Exception] = None
+class LimitadorTaxa:
+    """
+    Token bucket compartilhado por todas as sessões. A concorrência segue AIMD:
+    sobe aos poucos enquanto a latência está boa e cai pela metade em 429/403.
+    As vagas de concorrência são contadas por espelho (a taxa é global): consultas
+    presas num espelho lento não travam as que vão para o outro.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self.taxa = TAXA_INICIAL_REQ_S
+        self.limite_concorrencia = float(CONCORRENCIA_INICIAL)
+        self._tokens = 1.0
+        self._ultimo_abastecimento = time.monotonic()
+        self._em_andamento: Dict[str, int] = collections.Counter()
+        self._pausado_ate = 0.0
+        self.bloqueios = 0
+        self.ultimo_bloqueio: Optional[float] = None
+
+    def _abastecer(self, agora: float):
+        capacidade = max(1.0, self.taxa)
+        self._tokens = min(capacidade, self._tokens + (agora - self._ultimo_abastecimento) * self.taxa)
+        self._ultimo_abastecimento = agora
+
+    def concorrencia(self) -> int:
+        with self._cond:
+            return max(1, int(self.limite_concorrencia))
+
+    def adquirir(self, espelho: str = "", timeout: float = 60.0):
+        prazo = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                agora = time.monotonic()
+                self._abastecer(agora)
+
+                if agora < self._pausado_ate:
+                    espera = self._pausado_ate - agora
+                elif self._em_andamento[espelho] >= max(1, int(self.limite_concorrencia)):
+                    espera = 0.25
+                elif self._tokens < 1.0:
+                    espera = (1.0 - self._tokens) / self.taxa
+                else:
+                    self._tokens -= 1.0
+                    self._em_andamento[espelho] += 1
+                    return
+
+                if agora + espera > prazo:
+                    raise RuntimeError("Tempo esgotado aguardando vaga no limitador de requisições.")
+                self._cond.wait(espera)
+
+    def liberar(
+            self,
+            latencia: float,
+            status: Optional[int],
+            retry_after: Optional[float] = None,
+            espelho: str = "",
+    ):
+        with self._cond:
+            self._em_andamento[espelho] = max(0, self._em_andamento[espelho] - 1)
+
+            if status in STATUS_BLOQUEIO:
+                # Redução multiplicativa + pausa global (respeitando Retry-After)
+                self.limite_concorrencia = max(1.0, self.limite_concorrencia / 2)
+                self.taxa = max(TAXA_MINIMA_REQ_S, self.taxa / 2)
+                self._tokens = 0.0
+                pausa = retry_after if retry_after is not None else PAUSA_BLOQUEIO_S
+                self._pausado_ate = max(self._pausado_ate, time.monotonic() + pausa)
+                self.bloqueios += 1
+                self.ultimo_bloqueio = time.time()
+            elif status is not None and status < 400:
+                if latencia <= LATENCIA_ALVO_S:
+                    self.limite_concorrencia = min(
+                        float(CONCORRENCIA_MAXIMA),
+                        self.limite_concorrencia + 1.0 / self.limite_concorrencia,
+                    )
+                    self.taxa = min(TAXA_MAXIMA_REQ_S, self.taxa + 0.1)
+                else:
+                    # Latência acima do alvo: servidor saturando, recua de leve
+                    self.limite_concorrencia = max(1.0, self.limite_concorrencia * 0.9)
+
+            self._cond.notify_all()
+
+    def lotado(self, espelho: str = "") -> bool:
+        with self._cond:
+            return self._em_andamento[espelho] >= max(1, int(self.limite_concorrencia))
+
+    def estado(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "taxa": self.taxa,
+                "concorrencia": max(1, int(self.limite_concorrencia)),
+                "em_andamento": sum(self._em_andamento.values()),
+                "pausado_por": max(0.0, self._pausado_ate - time.monotonic()),
+                "bloqueios": self.bloqueios,
+                "ultimo_bloqueio": self.ultimo_bloqueio,
+            }
+
+
+@st.cache_resource
+def obter_limitador() -> LimitadorTaxa:
+    return LimitadorTaxa()
 
-    for base in BASE_URLS:
-        url = base if concurso is None else f"{base}/{concurso}"
+
+def _retry_after(resp: requests.Response) -> Optional[float]:
+    try:
+        return float(resp.headers.get("Retry-After", ""))
+    except ValueError:
+        return None
+
+
+def _get_limitado(
+        url: str,
+        espelho: str = "",
+        enviado: Optional[threading.Event] = None,
+) -> Tuple[requests.Response, float]:
+    """
+    GET respeitando o limitador. Devolve a resposta e a latência da última
+    tentativa; `enviado` é sinalizado quando a requisição sai do limitador.
+    """
+    limitador = obter_limitador()
+
+    for _tentativa in range(TENTATIVAS_BLOQUEIO):
+        limitador.adquirir(espelho)
+        if enviado is not None:
+            enviado.set()
+        inicio = time.monotonic()
+        status: Optional[int] = None
+        retry_after: Optional[float] = None
         try:
             r = requests.get(url, headers=_headers(), timeout=20)
-            r.raise_for_status()
+            status = r.status_code
+            if status in STATUS_BLOQUEIO:
+                retry_after = _retry_after(r)
+        finally:
+            latencia = time.monotonic() - inicio
+            limitador.liberar(latencia, status, retry_after, espelho=espelho)
+
+        # 403 costuma ser bloqueio do espelho: melhor tentar a próxima URL
+        if status != 429:
+            break
 
-            if not _is_json_response(r):
-                raise RuntimeError("A resposta não veio em JSON (content-type inesperado).")
+    if status in STATUS_BLOQUEIO:
+        raise RuntimeError(f"A Caixa limitou as requisições (HTTP {status}).")
+    return r, latencia
 
-            data = r.json()
 
-            if any(k in data for k in ("dezenasSorteadasOrdemSorteio", "listaDezenas", "dezenasSorteadas")):
-                return data
+class SaudeEspelhos:
+    """
+    Latência recente e falhas seguidas de cada espelho em BASE_URLS,
+    compartilhadas por todas as sessões. A média móvel exponencial escolhe o
+    primário (reage rápido a um espelho degradado); a janela dá o p95 usado
+    como prazo do hedge. Um espelho com muitas falhas seguidas fica de
+    quarentena e só volta a ser tentado por último.
+    """
 
-            raise RuntimeError("JSON recebido, mas não encontrei campos esperados de dezenas.")
-        except Exception as e:
-            last_error = e
-            continue
+    def __init__(self, bases: List[str]):
+        self._lock = threading.Lock()
+        self._latencias = {b: collections.deque(maxlen=JANELA_LATENCIA_ESPELHO) for b in bases}
+        self._media: Dict[str, Optional[float]] = {b: None for b in bases}
+        self._falhas = {b: 0 for b in bases}
+        self._isolado_ate = {b: 0.0 for b in bases}
+
+    def registrar(self, base: str, latencia: Optional[float], saudavel: bool):
+        with self._lock:
+            if saudavel:
+                self._latencias[base].append(latencia)
+                media = self._media[base]
+                self._media[base] = latencia if media is None else media + ALFA_LATENCIA_ESPELHO * (latencia - media)
+                self._falhas[base] = 0
+                return
+            self._falhas[base] += 1
+            if self._falhas[base] >= FALHAS_PARA_ISOLAR_ESPELHO:
+                self._isolado_ate[base] = time.monotonic() + QUARENTENA_ESPELHO_S
+
+    def registrar_atraso(self, base: str, decorrido: float):
+        """
+        O espelho perdeu a corrida para o hedge: ainda não respondeu, mas já
+        sabemos que leva pelo menos `decorrido`. Só puxa a média para cima.
+        """
+        with self._lock:
+            media = self._media[base]
+            if media is not None and decorrido > media:
+                self._media[base] = media + ALFA_LATENCIA_ESPELHO * (decorrido - media)
+
+    def _percentil(self, base: str, q: float) -> Optional[float]:
+        amostras = self._latencias[base]
+        if len(amostras) < AMOSTRAS_MINIMAS_P95:
+            return None
+        return float(np.percentile(amostras, q))
+
+    def ordem(self) -> List[str]:
+        """
+        Saudáveis primeiro, da menor latência média para a maior. Espelho ainda
+        sem amostras fica depois dos medidos (aprende pelos hedges), na ordem de BASE_URLS.
+        """
+        agora = time.monotonic()
+        with self._lock:
+            def chave(item: Tuple[int, str]):
+                pos, base = item
+                media = self._media[base]
+                return self._isolado_ate[base] > agora, media if media is not None else float("inf"), pos
+
+            return [b for _pos, b in sorted(enumerate(self._latencias), key=chave)]
+
+    def atraso_hedge(self, base: str) -> float:
+        with self._lock:
+            p95 = self._percentil(base, 95)
+        return ATRASO_HEDGE_PADRAO_S if p95 is None else max(ATRASO_HEDGE_MINIMO_S, p95)
+
+    def estado(self) -> List[Dict[str, Any]]:
+        agora = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "espelho": base,
+                    "amostras": len(self._latencias[base]),
+                    "media_s": self._media[base],
+                    "p95_s": self._percentil(base, 95),
+                    "falhas_seguidas": self._falhas[base],
+                    "quarentena_s": max(0.0, self._isolado_ate[base] - agora),
+                }
+                for base in self._latencias
+            ]
+
+
+@st.cache_resource
+def obter_saude_espelhos() -> SaudeEspelhos:
+    return SaudeEspelhos(BASE_URLS)
+
+
+def _buscar_no_espelho(
+        ctx: Any,
+        saude: SaudeEspelhos,
+        base: str,
+        concurso: Optional[int],
+        enviado: threading.Event,
+) -> Dict[str, Any]:
+    add_script_run_ctx(threading.current_thread(), ctx)
+    url = base if concurso is None else f"{base}/{concurso}"
+    latencia: Optional[float] = None
+    saudavel = False
+    try:
+        r, latencia = _get_limitado(url, espelho=base, enviado=enviado)
+        # 4xx comum (ex.: concurso que ainda não existe) é resposta legítima do espelho
+        saudavel = r.status_code < 500
+        r.raise_for_status()
+
+        if not _is_json_response(r):
+            saudavel = False
+            raise RuntimeError("A resposta não veio em JSON (content-type inesperado).")
+
+        data = r.json()
+
+        if any(k in data for k in ("dezenasSorteadasOrdemSorteio", "listaDezenas", "dezenasSorteadas")):
+            return data
+
+        raise RuntimeError("JSON recebido, mas não encontrei campos esperados de dezenas.")
+    finally:
+        enviado.set()
+        saude.registrar(base, latencia, saudavel)
+
+
+def _buscar_resultado_caixa(concurso: Optional[int]) -> Dict[str, Any]:
+    """
+    Consulta o espelho mais rápido entre os saudáveis. Se ele não responder
+    dentro do seu p95 observado, dispara a mesma consulta no próximo espelho
+    (hedge) e fica com o primeiro JSON válido. Se um falhar, o próximo entra na hora.
+    """
+    saude = obter_saude_espelhos()
+    limitador = obter_limitador()
+    espelhos = saude.ordem()
+    ctx = get_script_run_ctx()
+    last_error: Optional[Exception] = None
+
+    # Sem "with": a consulta que perdeu a corrida termina sozinha (e ainda alimenta a latência)
+    pool = ThreadPoolExecutor(max_workers=len(espelhos))
+    pendentes: Dict[Any, Tuple[str, float]] = {}
+    try:
+        for base in espelhos:
+            enviado = threading.Event()
+            futuro = pool.submit(_buscar_no_espelho, ctx, saude, base, concurso, enviado)
+            pendentes[futuro] = (base, time.monotonic())
+            ultimo = base == espelhos[-1]
+            espera = None if ultimo else saude.atraso_hedge(base)
+            if not ultimo:
+                # O prazo do hedge conta do envio, não da espera por token no limitador;
+                # se a espera é por vaga no próprio espelho (lotado), ele é o gargalo.
+                while not enviado.wait(espera) and not limitador.lotado(base):
+                    pass
+            while pendentes:
+                prontos, _ = wait(pendentes, timeout=espera, return_when=FIRST_COMPLETED)
+                if not prontos:
+                    break  # passou do p95: hedge no próximo espelho
+
+                for futuro in prontos:
+                    del pendentes[futuro]
+                    try:
+                        data = futuro.result()
+                    except Exception as e:
+                        last_error = e
+                        continue
+                    agora = time.monotonic()
+                    for perdedor, inicio in pendentes.values():
+                        saude.registrar_atraso(perdedor, agora - inicio)
+                    return data
+                if not ultimo:
+                    break  # falhou: próximo espelho sem esperar
+    finally:
+        pool.shutdown(wait=False)
 
     raise RuntimeError(f"Não consegui consultar o resultado na Caixa. Detalhe: {last_error}")
 
 
+def exibir_status_limitador():
+    estado = obter_limitador().estado()
+    ultimo = estado["ultimo_bloqueio"]
+    if ultimo is None or time.time() - ultimo > JANELA_AVISO_BLOQUEIO_S:
+        return
+
+    st.warning(
+        f"A Caixa limitou as requisições recentemente ({estado['bloqueios']} bloqueio(s)). "
+        f"Velocidade reduzida para {estado['taxa']:.1f} req/s com {estado['concorrencia']} em paralelo."
+    )
+
+
+def texto_limitador() -> str:
+    """
+    Situação do limitador para o texto de progresso das buscas (vazio se normal),
+    para o bloqueio aparecer durante a busca e não só na execução seguinte.
+    """
+    estado = obter_limitador().estado()
+    if estado["pausado_por"] > 0:
+        return f" · Caixa limitou: pausado por {estado['pausado_por']:.0f} s"
+    ultimo = estado["ultimo_bloqueio"]
+    if ultimo is not None and time.time() - ultimo <= JANELA_AVISO_BLOQUEIO_S:
+        return f" · velocidade reduzida: {estado['taxa']:.1f} req/s, {estado['concorrencia']} em paralelo"
+    return ""
+
+
 def extrair_dezenas_sorteadas(data: Dict[str, Any]) -> List[int]:
     dezenas = (
             data.get("dezenasSorteadasOrdemSorteio")
@@ -467,22 +709,37 @@ def extrair_dezenas_sorteadas(data: Dict[str, Any]) -> List[int]:
     return sorted(dezenas_int)
 
 
-def calcular_premio_por_acertos(data: Dict[str, Any], acertos: int) -> float:
-    if acertos < 11 or acertos > 15:
-        return 0.0
-
-    faixa_esperada = 16 - acertos
+def _rateio_da_faixa(data: Dict[str, Any], faixa: int) -> Optional[Dict[str, Any]]:
     rateios = data.get("listaRateioPremio") or []
     if not isinstance(rateios, list):
-        return 0.0
+        return None
 
     for item in rateios:
         if not isinstance(item, dict):
             continue
-        if item.get("faixa") == faixa_esperada:
-            return _to_float_brasil(item.get("valorPremio", 0))
+        if item.get("faixa") == faixa:
+            return item
 
-    return 0.0
+    return None
+
+
+def calcular_premio_por_acertos(data: Dict[str, Any], acertos: int) -> float:
+    if acertos < 11 or acertos > 15:
+        return 0.0
+
+    item = _rateio_da_faixa(data, 16 - acertos)
+    return _to_float_brasil(item.get("valorPremio", 0)) if item else 0.0
+
+
+def calcular_ganhadores_por_acertos(data: Dict[str, Any], acertos: int) -> int:
+    if acertos < 11 or acertos > 15:
+        return 0
+
+    item = _rateio_da_faixa(data, 16 - acertos)
+    try:
+        return int(item.get("numeroDeGanhadores") or 0) if item else 0
+    except (TypeError, ValueError):
+        return 0
 
 
 def parse_data_concurso(data: Dict[str, Any]) -> date:
@@ -501,109 +758,844 @@ def parse_data_concurso(data: Dict[str, Any]) -> date:
         raise RuntimeError(f"Formato de data inesperado: {s}")
 
 
+# --- Concurso normalizado ---
+def mascara_de_dezenas(dezenas: List[int]) -> int:
+    mascara = 0
+    for d in dezenas:
+        mascara |= 1 << (d - 1)
+    return mascara
+
+
+def dezenas_da_mascara(mascara: int) -> List[int]:
+    return [d for d in range(1, 26) if mascara >> (d - 1) & 1]
+
+
+@dataclass(frozen=True, slots=True)
+class Concurso:
+    """
+    Concurso validado e convertido uma única vez, na ingestão.
+    premios[faixa - 1] é o valorPremio da faixa (faixa 1 = 15 acertos) e
+    ganhadores[faixa - 1], o número de ganhadores dela.
+    """
+
+    numero: int
+    data: date
+    dezenas: Tuple[int, ...]
+    mascara: int
+    premios: Tuple[float, ...]
+    ganhadores: Tuple[int, ...]
+
+    @classmethod
+    def do_json(cls, data: Dict[str, Any], numero_padrao: Optional[int] = None) -> "Concurso":
+        numero = data.get("numero") or data.get("numeroConcurso") or numero_padrao
+        if not numero:
+            raise RuntimeError("Não encontrei o número do concurso no retorno da Caixa.")
+
+        dezenas = extrair_dezenas_sorteadas(data)
+        return cls(
+            numero=int(numero),
+            data=parse_data_concurso(data),
+            dezenas=tuple(dezenas),
+            mascara=mascara_de_dezenas(dezenas),
+            premios=tuple(calcular_premio_por_acertos(data, 16 - faixa) for faixa in range(1, FAIXAS + 1)),
+            ganhadores=tuple(calcular_ganhadores_por_acertos(data, 16 - faixa) for faixa in range(1, FAIXAS + 1)),
+        )
+
+    @classmethod
+    def do_registro(cls, reg: np.void) -> "Concurso":
+        mascara = int(reg["mascara"])
+        return cls(
+            numero=int(reg["numero"]),
+            data=date.fromordinal(int(reg["data"])),
+            dezenas=tuple(dezenas_da_mascara(mascara)),
+            mascara=mascara,
+            premios=tuple(float(v) for v in reg["premio"]),
+            ganhadores=tuple(int(v) for v in reg["ganhadores"]),
+        )
+
+    def registro(self) -> Tuple[int, int, int, Tuple[float, ...], Tuple[int, ...]]:
+        return self.numero, self.data.toordinal(), self.mascara, self.premios, self.ganhadores
+
+    def acertos(self, jogo: List[int]) -> int:
+        return (self.mascara & mascara_de_dezenas(jogo)).bit_count()
+
+    def premio(self, acertos: int) -> float:
+        if acertos < 11 or acertos > 15:
+            return 0.0
+        return self.premios[15 - acertos]
+
+    def total_por_grupo(self, jogos: List[List[int]]) -> float:
+        return sum(self.premio(self.acertos(jogo)) for jogo in jogos)
+
+
+@st.cache_resource(ttl=3600)
+def buscar_concurso(concurso: Optional[int]) -> Concurso:
+    # cache_resource: o Concurso é imutável, então todas as sessões dividem a
+    # mesma instância, sem pickle/cópia a cada acesso.
+    return Concurso.do_json(_buscar_resultado_caixa(concurso), numero_padrao=concurso)
+
+
+# --- Histórico binário (memory-mapped) ---
+@contextmanager
+def trava_de_arquivo(caminho: str):
+    """
+    Trava exclusiva entre processos, num arquivo à parte (criado se não existir).
+    Bloqueia até conseguir.
+    """
+    with open(caminho, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+
+            f.seek(0)
+            while True:
+                try:
+                    # LK_LOCK desiste depois de ~10 s tentando: insiste até conseguir
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        else:
+            import fcntl
+
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if os.name == "nt":
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _unir_registros(atual: np.ndarray, novos: np.ndarray) -> np.ndarray:
+    """
+    Registros de atual e novos numa cópia ordenada por número; no mesmo número,
+    fica o de novos.
+    """
+    todos = np.concatenate([atual, novos])
+    _, idx = np.unique(todos["numero"][::-1], return_index=True)
+    return todos[::-1][idx]
+
+
+class HistoricoBinario:
+    """
+    Histórico colunar com um registro de largura fixa por concurso, aberto via
+    mmap (somente leitura, compartilhado pelo SO entre sessões e processos).
+    Concursos novos ficam pendentes em memória e são gravados em lote. Se o
+    diretório não aceita escrita, o histórico passa a viver só em memória.
+    """
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._pendentes: Dict[int, Concurso] = {}
+        self._base = self._abrir()
+        self._acumulada: Optional[np.ndarray] = None
+        self._premios: Optional[np.ndarray] = None
+        self._sorteios: Optional[SorteiosOcorridos] = None
+        self.snapshot: Optional[Dict[str, Any]] = None
+        self.erro_snapshot: Optional[str] = None
+        self.erro_gravacao: Optional[str] = None
+
+    def _abrir(self) -> np.ndarray:
+        try:
+            base = np.load(self.caminho, mmap_mode="r")
+        except (OSError, ValueError):
+            return np.empty(0, dtype=DTYPE_HISTORICO)
+        if base.dtype != DTYPE_HISTORICO:
+            return np.empty(0, dtype=DTYPE_HISTORICO)
+        return base
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._base) + len(self._pendentes)
+
+    def base(self) -> np.ndarray:
+        """
+        Registros já gravados (ordenados por número), sem os pendentes.
+        """
+        with self._lock:
+            return self._base
+
+    def concurso(self, numero: int) -> Optional[Concurso]:
+        with self._lock:
+            pendente = self._pendentes.get(numero)
+            if pendente is not None:
+                return pendente
+            base = self._base
+        pos = int(np.searchsorted(base["numero"], numero))
+        if pos < len(base) and int(base["numero"][pos]) == numero:
+            return Concurso.do_registro(base[pos])
+        return None
+
+    def adicionar(self, concurso: Concurso) -> Concurso:
+        with self._lock:
+            self._pendentes[concurso.numero] = concurso
+            precisa_gravar = len(self._pendentes) >= LOTE_GRAVACAO_HISTORICO
+        if precisa_gravar:
+            self.gravar()
+        return concurso
+
+    def gravar(self):
+        with self._lock:
+            if not self._pendentes:
+                return
+            novos = np.array([c.registro() for c in self._pendentes.values()], dtype=DTYPE_HISTORICO)
+            self._gravar(novos)
+            self._pendentes.clear()
+
+    def mesclar(self, registros: np.ndarray):
+        """
+        Junta registros prontos (ex.: de um snapshot) ao arquivo do histórico.
+        """
+        with self._lock:
+            self._gravar(np.asarray(registros, dtype=DTYPE_HISTORICO))
+
+    def _gravar(self, novos: np.ndarray):
+        if self.erro_gravacao is None:
+            try:
+                self._gravar_em_disco(novos)
+                return
+            except OSError as e:
+                # Ex.: .dados somente leitura. O mmap pode já ter sido solto
+                self.erro_gravacao = str(e)
+                self._base = self._abrir()
+        self._gravar_em_memoria(novos)
+
+    def _gravar_em_disco(self, novos: np.ndarray):
+        os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+        # Ler, mesclar e substituir sob a trava: dois workers gravando ao mesmo
+        # tempo não perdem os concursos um do outro
+        with trava_de_arquivo(f"{self.caminho}.lock"):
+            atual = self._abrir()
+            todos = _unir_registros(atual, novos)  # cópia: atual pode ser solto
+            del atual
+
+            m = len(self._base)
+            so_cauda = 0 < m <= len(todos) and np.array_equal(todos[:m], self._base)
+            # No Windows um arquivo ainda mapeado não pode ser substituído: solta o
+            # mmap antes (views que outras sessões ainda seguram são esperadas abaixo)
+            self._base = np.empty(0, dtype=DTYPE_HISTORICO)
+            self._sorteios = None
+
+            tmp = f"{self.caminho}.{os.getpid()}.tmp"
+            try:
+                with open(tmp, "wb") as f:
+                    np.save(f, todos)
+            except OSError:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+            self._substituir(tmp)
+            self._base = self._abrir()
+        self._estender_indices(m, so_cauda)
+
+    def _gravar_em_memoria(self, novos: np.ndarray):
+        """
+        Sem disco: a base vira um array comum desta réplica (perdido ao reiniciar).
+        """
+        todos = _unir_registros(self._base, novos)
+        m = len(self._base)
+        so_cauda = 0 < m <= len(todos) and np.array_equal(todos[:m], self._base)
+        self._base = todos
+        self._sorteios = None
+        self._estender_indices(m, so_cauda)
+
+    def _substituir(self, tmp: str):
+        for tentativa in range(TENTATIVAS_SUBSTITUIR_HISTORICO):
+            try:
+                os.replace(tmp, self.caminho)
+                return
+            except PermissionError:
+                if tentativa == TENTATIVAS_SUBSTITUIR_HISTORICO - 1:
+                    os.remove(tmp)
+                    raise
+                gc.collect()
+                time.sleep(0.05 * (tentativa + 1))
+
+    def _estender_indices(self, m: int, so_cauda: bool):
+        """
+        Mantém os índices acumulados alinhados ao arquivo. No caso comum (só
+        entraram concursos depois dos m já gravados) soma apenas a cauda nova;
+        se algo mudou no meio, descarta e deixa recalcular sob demanda.
+        """
+        if not so_cauda:
+            self._acumulada = None
+            self._premios = None
+            self._sorteios = None
+            return
+
+        cauda = self._base[m:]
+        if self._acumulada is not None and len(self._acumulada) == m + 1:
+            self._acumulada = np.concatenate([self._acumulada, self._acumulada[-1] + frequencia_acumulada(cauda)[1:]])
+        if self._premios is not None and len(self._premios) == m + 1:
+            self._premios = np.concatenate([self._premios, self._premios[-1] + premios_acumulados(cauda)[1:]])
+
+    def frequencia_acumulada(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Base gravada e a frequência acumulada alinhada a ela (recalculada só
+        quando o arquivo muda).
+        """
+        with self._lock:
+            if self._acumulada is None or len(self._acumulada) != len(self._base) + 1:
+                self._acumulada = frequencia_acumulada(self._base)
+            return self._base, self._acumulada
+
+    def usar_frequencia_acumulada(self, acumulada: np.ndarray):
+        with self._lock:
+            if len(acumulada) == len(self._base) + 1:
+                self._acumulada = acumulada
+
+    def premios_acumulados(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Base gravada e as somas acumuladas de prêmios/ganhadores alinhadas a ela.
+        """
+        with self._lock:
+            if self._premios is None or len(self._premios) != len(self._base) + 1:
+                self._premios = premios_acumulados(self._base)
+            return self._base, self._premios
+
+    def sorteios_ocorridos(self) -> SorteiosOcorridos:
+        """
+        Bitset das combinações já sorteadas na base gravada (refeito em poucos
+        ms quando o arquivo muda).
+        """
+        with self._lock:
+            if self._sorteios is None or len(self._sorteios) != len(self._base):
+                self._sorteios = SorteiosOcorridos(self._base["mascara"], self._base["numero"])
+            return self._sorteios
+
+
+def semear_historico(historico: HistoricoBinario):
+    """
+    Importa o snapshot (se existir) quando ele traz concursos que o histórico
+    local ainda não tem. Uma réplica nova já nasce com o histórico completo.
+    """
+    if not os.path.exists(CAMINHO_SNAPSHOT):
+        return
+
+    try:
+        snap = carregar_snapshot(CAMINHO_SNAPSHOT)
+        if snap.historico.dtype != DTYPE_HISTORICO:
+            raise SnapshotInvalido("Formato dos registros do snapshot difere do histórico atual.")
+    except SnapshotInvalido as e:
+        historico.erro_snapshot = str(e)
+        return
+
+    historico.snapshot = snap.manifesto
+    base = historico.base()
+    ultimo_local = int(base["numero"].max()) if len(base) else 0
+    if ultimo_local >= snap.manifesto["ultimo_numero"] and len(base) >= len(snap.historico):
+        return
+
+    historico.mesclar(snap.historico)
+    if np.array_equal(historico.base()["numero"], snap.historico["numero"]):
+        historico.usar_frequencia_acumulada(snap.frequencia_acumulada)
+
+
+@st.cache_resource
+def obter_historico() -> HistoricoBinario:
+    historico = HistoricoBinario(os.path.join(DIR_DADOS, ARQUIVO_HISTORICO))
+    semear_historico(historico)
+    return historico
+
+
+class FilaReposicao:
+    """
+    Concursos que falharam ao carregar numa busca. Uma thread em segundo plano
+    tenta cada um de novo, com espera exponencial entre as tentativas, e grava
+    no histórico binário o que conseguir; a thread termina quando a fila esvazia.
+    Enquanto um concurso está na fila, as buscas não pagam por ele de novo.
+    """
+
+    def __init__(self, historico: HistoricoBinario):
+        self._cond = threading.Condition()
+        self._historico = historico
+        self._itens: Dict[int, Dict[str, Any]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self.repostos = 0
+
+    @staticmethod
+    def _espera(tentativas: int) -> float:
+        espera = min(ESPERA_REPOSICAO_MAXIMA_S, ESPERA_REPOSICAO_INICIAL_S * 2 ** tentativas)
+        return espera * random.uniform(0.8, 1.2)
+
+    def registrar_falha(self, numero: int, erro: Exception):
+        with self._cond:
+            item = self._itens.get(numero)
+            if item is None or item["desistiu"]:
+                # Falha nova (ou numa busca depois de desistir): recomeça a contagem
+                item = self._itens[numero] = {"tentativas": 0, "desistiu": False}
+            item["erro"] = str(erro)
+            item["proxima"] = time.monotonic() + self._espera(item["tentativas"])
+
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._trabalhar,
+                    args=(get_script_run_ctx(),),
+                    name="reposicao-concursos",
+                    daemon=True,
+                )
+                self._thread.start()
+            self._cond.notify()
+
+    def pendente(self, numero: int) -> bool:
+        with self._cond:
+            item = self._itens.get(numero)
+            return item is not None and not item["desistiu"]
+
+    def descartar(self, numero: int):
+        with self._cond:
+            self._itens.pop(numero, None)
+
+    def _proximo(self) -> Optional[int]:
+        """
+        Espera até algum concurso da fila vencer o prazo (o mais recente primeiro).
+        None quando não há mais nada a tentar.
+        """
+        with self._cond:
+            while True:
+                ativos = {n: i["proxima"] for n, i in self._itens.items() if not i["desistiu"]}
+                if not ativos:
+                    self._thread = None
+                    return None
+                agora = time.monotonic()
+                prontos = [n for n, proxima in ativos.items() if proxima <= agora]
+                if prontos:
+                    return max(prontos)
+                self._cond.wait(min(ativos.values()) - agora)
+
+    def _trabalhar(self, ctx: Any):
+        add_script_run_ctx(threading.current_thread(), ctx)
+        try:
+            while True:
+                numero = self._proximo()
+                if numero is None:
+                    return
+                try:
+                    if self._historico.concurso(numero) is None:
+                        dados = _buscar_resultado_caixa(numero)
+                        self._historico.adicionar(Concurso.do_json(dados, numero_padrao=numero))
+                except Exception as e:
+                    with self._cond:
+                        item = self._itens.get(numero)
+                        if item is not None:
+                            item["tentativas"] += 1
+                            item["erro"] = str(e)
+                            item["desistiu"] = item["tentativas"] >= TENTATIVAS_REPOSICAO
+                            item["proxima"] = time.monotonic() + self._espera(item["tentativas"])
+                else:
+                    with self._cond:
+                        if self._itens.pop(numero, None) is not None:
+                            self.repostos += 1
+        finally:
+            self._historico.gravar()
+
+    def estado(self) -> List[Dict[str, Any]]:
+        with self._cond:
+            agora = time.monotonic()
+            return [
+                {
+                    "concurso": n,
+                    "tentativas": i["tentativas"],
+                    "proxima_s": None if i["desistiu"] else max(0.0, i["proxima"] - agora),
+                    "erro": i["erro"],
+                }
+                for n, i in sorted(self._itens.items(), reverse=True)
+            ]
+
+
+@st.cache_resource
+def obter_fila_reposicao() -> FilaReposicao:
+    return FilaReposicao(obter_historico())
+
+
+def _carregar_concurso(historico: HistoricoBinario, numero: int) -> Concurso:
+    return historico.adicionar(Concurso.do_json(_buscar_resultado_caixa(numero), numero_padrao=numero))
+
+
+def _carregar_em_thread(
+        ctx: Any,
+        historico: HistoricoBinario,
+        numero: int,
+        perfil: Optional[PerfilExecucao] = None,
+) -> Concurso:
+    add_script_run_ctx(threading.current_thread(), ctx)
+    if perfil is not None:
+        return perfil.executar(_carregar_concurso, historico, numero)
+    return _carregar_concurso(historico, numero)
+
+
+def iterar_concursos_desc(ultimo_num: int) -> Iterator[Tuple[int, Optional[Concurso], Optional[Exception]]]:
+    """
+    Percorre do concurso mais recente para o mais antigo. O que já está no
+    histórico binário sai direto dele; o resto é buscado em lotes paralelos do
+    tamanho da concorrência atual do limitador. Quem falhar vai para a fila de
+    reposição; os que já estão nela saem como falha, sem nova consulta.
+    """
+    historico = obter_historico()
+    fila = obter_fila_reposicao()
+    limitador = obter_limitador()
+    ctx = get_script_run_ctx()
+    perfil = st.session_state.get("perfil_em_andamento")
+    num = ultimo_num
+
+    # Sem "with": ao cancelar a busca, o gerador é fechado e não espera as
+    # consultas em andamento (que terminam sozinhas e gravam no histórico)
+    pool = ThreadPoolExecutor(max_workers=CONCORRENCIA_MAXIMA)
+    try:
+        while num >= 1:
+            concurso = historico.concurso(num)
+            if concurso is not None:
+                yield num, concurso, None
+                num -= 1
+                continue
+
+            lote = list(range(num, max(0, num - limitador.concorrencia()), -1))
+            futuros = {
+                n: pool.submit(_carregar_em_thread, ctx, historico, n, perfil)
+                for n in lote
+                if historico.concurso(n) is None and not fila.pendente(n)
+            }
+            for n in lote:
+                if n not in futuros:
+                    concurso = historico.concurso(n)
+                    if concurso is None:
+                        yield n, None, RuntimeError(f"Concurso {n} está na fila de reposição.")
+                    else:
+                        yield n, concurso, None
+                    continue
+                try:
+                    concurso = futuros[n].result()
+                except Exception as e:
+                    fila.registrar_falha(n, e)
+                    yield n, None, e
+                    continue
+                fila.descartar(n)
+                yield n, concurso, None
+            num -= len(lote)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        historico.gravar()
+
+
+def nota_jogo_no_historico(jogo: List[int]) -> Optional[str]:
+    """
+    O jogo contra o histórico gravado: se já saiu inteiro ou o melhor
+    resultado que teria feito.
+    """
+    sorteios = obter_historico().sorteios_ocorridos()
+    if len(sorteios) == 0:
+        return None
+
+    sorteado = sorteios.sorteada_em(jogo)
+    if sorteado is not None:
+        return f"Já saiu inteiro no concurso {sorteado}."
+    acertos, concurso = sorteios.mais_perto(jogo)
+    return (
+        f"Nunca saiu em {len(sorteios)} concursos gravados · "
+        f"melhor resultado: {acertos} acertos (concurso {concurso})."
+    )
+
+
 def exibir_conferencia_de_jogos(
         titulo_bloco: str,
         jogos: List[List[int]],
-        sorteadas: List[int],
-        data: Dict[str, Any],
+        concurso: Concurso,
         prefixo_nome: str,
 ) -> float:
     total_bloco = 0.0
     st.subheader(titulo_bloco)
 
-    sorteadas_set = set(sorteadas)
+    sorteadas_set = set(concurso.dezenas)
+    cartoes = []
+    sem_premio = []
 
     for idx, jogo in enumerate(jogos, start=1):
         acertos_set = set(jogo) & sorteadas_set
         qtd = len(acertos_set)
-        premio = calcular_premio_por_acertos(data, qtd)
+        premio = concurso.premio(qtd)
         total_bloco += premio
 
-        with st.container(border=True):
-            st.markdown(
-                f"<h3 style='text-align: center; margin-bottom: 15px;'>{prefixo_nome} {idx}</h3>",
-                unsafe_allow_html=True,
-            )
+        img_src = src_imagem("certo.png" if qtd >= 11 else "errado.png")
+        cartoes.append(cartao_jogo_html(
+            f"{prefixo_nome} {idx}",
+            chips_com_acertos_html(sorted(jogo), acertos_set),
+            notas=[nota_jogo_no_historico(jogo)],
+            estatisticas=[
+                ("Acertos", f"{qtd}"),
+                ("Situação", f'<div class="status-wrap"><img class="status-img" src="{img_src}" alt="status"></div>'),
+                ("Prêmio", formatar_moeda_br(premio)),
+            ],
+            rotulo_chips="Números do jogo:",
+        ))
+        if qtd >= 11 and premio == 0.0:
+            sem_premio.append(f"{prefixo_nome} {idx}")
+
+    render_cartoes(cartoes)
+    for nome in sem_premio:
+        st.warning(f"{nome}: não consegui ler o valor do prêmio dessa faixa no retorno da Caixa (veio 0).")
 
-            c1, c2, c3 = st.columns(3)
+    return total_bloco
 
-            with c1:
-                st.metric("Acertos", f"{qtd}")
 
-            with c2:
-                st.markdown(
-                    "<p style='font-size: 14px; margin-bottom: 6px; color: var(--muted); text-align: center;'>Situação</p>",
-                    unsafe_allow_html=True,
-                )
-                img_file = "certo.png" if qtd >= 11 else "errado.png"
-                img_uri = img_to_data_uri(img_file)
-                st.markdown(
-                    f"""<div class="status-wrap"><img class="status-img" src="{img_uri}" alt="status"></div>""",
-                    unsafe_allow_html=True,
-                )
+def obter_ultimo_concurso() -> Tuple[int, date]:
+    ultimo = buscar_concurso(None)
+    return ultimo.numero, ultimo.data
 
-            with c3:
-                st.metric("Prêmio", formatar_moeda_br(premio))
 
-            st.write("**Números do jogo:**")
-            render_chips_com_acertos(sorted(jogo), acertos_set)
+def estimar_concursos_no_periodo(dt_ini: date, dt_fim: date) -> int:
+    """
+    Estimativa para a barra de progresso: interpola o número do concurso pela
+    data, usando o histórico binário e o primeiro/último concurso como âncoras.
+    """
+    ultimo_num, dt_ultimo = obter_ultimo_concurso()
+    base = obter_historico().base()
 
-            if qtd >= 11 and premio == 0.0:
-                st.warning("Não consegui ler o valor do prêmio dessa faixa no retorno da Caixa (veio 0).")
+    datas = np.concatenate([[DATA_PRIMEIRO_CONCURSO.toordinal()], base["data"], [dt_ultimo.toordinal()]])
+    numeros = np.concatenate([[1], base["numero"], [ultimo_num]])
+    num_ini, num_fim = np.interp([dt_ini.toordinal(), dt_fim.toordinal()], datas, numeros)
+    return max(1, int(round(num_fim - num_ini)) + 1)
 
-    return total_bloco
 
+def iterar_concursos_no_periodo(
+        dt_ini: date,
+        dt_fim: date,
+        inicio_num: Optional[int] = None,
+) -> Iterator[Tuple[int, Optional[Concurso], Optional[Exception]]]:
+    """
+    Entrega, à medida que chegam, os concursos com data dentro do período
+    (do mais recente para o mais antigo). Falhas são repassadas ao chamador,
+    menos as que com certeza caem depois do período. Concursos posteriores ao
+    período saem como (num, None, None): servem só de sinal de progresso, para
+    a tela (e o Cancelar) andar enquanto a busca desce até o período.
+    inicio_num retoma uma busca interrompida a partir daquele concurso.
+    """
+    if inicio_num is None:
+        inicio_num, _dt_ultimo = obter_ultimo_concurso()
+
+    # A data só diminui junto com o número: uma falha acima de um concurso
+    # posterior a dt_fim também é posterior. Até o próximo concurso lido, não se
+    # sabe de que lado a falha está; ela espera (a ordem decrescente se mantém).
+    falhas: List[Tuple[int, Exception]] = []
+    for num, concurso, erro in iterar_concursos_desc(inicio_num):
+        if erro is not None:
+            falhas.append((num, erro))
+            continue
 
-def total_por_grupo(data: Dict[str, Any], sorteadas: List[int], jogos: List[List[int]]) -> float:
-    total = 0.0
-    sset = set(sorteadas)
-    for jogo in jogos:
-        acertos = len(set(jogo) & sset)
-        total += calcular_premio_por_acertos(data, acertos)
-    return total
+        if concurso.data > dt_fim:
+            falhas.clear()
+            yield num, None, None
+            continue
+        for num_falha, erro_falha in falhas:
+            yield num_falha, None, erro_falha
+        falhas.clear()
+        if concurso.data < dt_ini:
+            return
+        yield num, concurso, None
 
+    for num_falha, erro_falha in falhas:
+        yield num_falha, None, erro_falha
 
-def calcular_frequencia_no_periodo(dt_ini: date, dt_fim: date) -> Tuple[Dict[int, int], int]:
-    if dt_ini > dt_fim:
-        raise RuntimeError("Data inicial maior que a data final.")
 
-    freq: Dict[int, int] = {i: 0 for i in range(1, 26)}
-    concursos_encontrados = 0
+def frequencia_pelo_indice(dt_ini: date, dt_fim: date) -> Optional[Tuple[Dict[int, int], int]]:
+    """
+    Frequência do período direto da frequência acumulada, sem varrer concursos.
+    Só responde se o histórico gravado cobre o período sem buracos (inclusive
+    o concurso mais recente, quando o período chega até ele); senão, None.
+    """
+    ultimo_num, _dt_ultimo = obter_ultimo_concurso()
+    base, acumulada = obter_historico().frequencia_acumulada()
+    if len(base) == 0:
+        return None
+
+    datas = base["data"]
+    numeros = base["numero"]
+    i = int(np.searchsorted(datas, dt_ini.toordinal(), side="left"))
+    j = int(np.searchsorted(datas, dt_fim.toordinal(), side="right"))
+
+    # Sem buracos dentro do trecho e nas duas bordas
+    if j > i and int(numeros[j - 1]) - int(numeros[i]) != j - 1 - i:
+        return None
+    primeiro = int(numeros[i]) if i < len(base) else ultimo_num + 1
+    if primeiro != 1 and (i == 0 or int(numeros[i - 1]) != primeiro - 1):
+        return None
+    if j == len(base):
+        if int(numeros[-1]) < ultimo_num:
+            return None
+    elif j > 0 and int(numeros[j]) != int(numeros[j - 1]) + 1:
+        return None
+
+    contagem = acumulada[j] - acumulada[i]
+    return {d: int(contagem[d - 1]) for d in range(1, 26)}, j - i
+
+
+def iterar_frequencia_no_periodo(
+        dt_ini: date,
+        dt_fim: date,
+        inicio_num: Optional[int] = None,
+        freq: Optional[Dict[int, int]] = None,
+        concursos_encontrados: int = 0,
+        faltando: Optional[List[int]] = None,
+) -> Iterator[Tuple[int, Dict[int, int], int]]:
+    """
+    Gera a frequência parcial (e a quantidade de concursos) a cada concurso lido
+    (inclusive os de antes do período, que não mudam a contagem). Para retomar, passe o último estado parcial junto com inicio_num. Os
+    concursos que não carregaram são anotados em faltando.
+    """
+    if freq is None:
+        freq = {i: 0 for i in range(1, 26)}
 
-    try:
-        data_ultimo = buscar_resultado(None)
-        ultimo_num = int(data_ultimo.get("numero") or data_ultimo.get("numeroConcurso"))
+    for num, concurso, erro in iterar_concursos_no_periodo(dt_ini, dt_fim, inicio_num):
+        if concurso is not None:
+            for d in concurso.dezenas:
+                freq[d] += 1
+            concursos_encontrados += 1
+        elif erro is not None and faltando is not None:
+            faltando.append(num)
+        yield num, freq, concursos_encontrados
 
-        limite_concursos = 900
-        verificados = 0
 
-        for num in range(ultimo_num, 0, -1):
-            if verificados >= limite_concursos:
-                break
+# --- Estatísticas de prêmios ---
+def trecho_gravado(base: np.ndarray, dt_ini: date, dt_fim: date) -> Tuple[int, int]:
+    """
+    Posições [i, j) dos concursos gravados com data dentro do período.
+    """
+    i = int(np.searchsorted(base["data"], dt_ini.toordinal(), side="left"))
+    j = int(np.searchsorted(base["data"], dt_fim.toordinal(), side="right"))
+    return i, j
 
-            verificados += 1
 
-            try:
-                data = buscar_resultado(num)
-                dt_concurso = parse_data_concurso(data)
+def premios_acumulados(historico: np.ndarray) -> np.ndarray:
+    """
+    Linha i = somas dos concursos [0, i) por faixa: [0] valorPremio,
+    [1] ganhadores e [2] concursos em que a faixa pagou prêmio. As somas de
+    um trecho contíguo saem da diferença de duas linhas.
+    """
+    premio = np.asarray(historico["premio"], dtype=np.float64)
+    ganhadores = np.asarray(historico["ganhadores"], dtype=np.float64)
+    partes = np.stack([premio, ganhadores, premio > 0], axis=1)
+    acumulada = np.zeros((len(historico) + 1, 3, FAIXAS))
+    np.cumsum(partes, axis=0, out=acumulada[1:])
+    return acumulada
 
-                if dt_concurso < dt_ini:
-                    break
 
-                if dt_ini <= dt_concurso <= dt_fim:
-                    dezenas = extrair_dezenas_sorteadas(data)
-                    for d in dezenas:
-                        freq[d] += 1
-                    concursos_encontrados += 1
+def estatisticas_de_premios(dt_ini: date, dt_fim: date) -> Optional[Dict[str, Any]]:
+    """
+    Prêmio médio e mediano e ganhadores por concurso, por faixa, nos concursos
+    gravados do período. Médias vêm do índice acumulado; a mediana olha só o
+    trecho do período no histórico binário (sem JSON nem rede).
+    """
+    base, acumulada = obter_historico().premios_acumulados()
+    i, j = trecho_gravado(base, dt_ini, dt_fim)
+    if j <= i:
+        return None
+
+    soma = acumulada[j] - acumulada[i]
+    pagou = soma[2]
+    premios = np.asarray(base["premio"][i:j])
+    intervalo, serie = serie_de_premios(base, acumulada, i, j)
+    return {
+        "concursos": j - i,
+        "media": np.divide(soma[0], pagou, out=np.zeros(FAIXAS), where=pagou > 0).tolist(),
+        "mediana": [float(np.median(col[col > 0])) if (col > 0).any() else 0.0 for col in premios.T],
+        "ganhadores": (soma[1] / (j - i)).tolist(),
+        "pagou": pagou.astype(int).tolist(),
+        "intervalo": intervalo,
+        "serie": serie,
+    }
+
+
+def serie_de_premios(base: np.ndarray, acumulada: np.ndarray, i: int, j: int) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Prêmio médio e ganhadores por concurso de cada faixa, mês a mês (ano a ano
+    em períodos longos). Cada ponto é a diferença de duas linhas do índice
+    acumulado, nas fronteiras do intervalo.
+    """
+    dias = (np.asarray(base["data"][i:j], dtype=np.int64) - ORDINAL_1970).astype("datetime64[D]")
+    meses = dias.astype("datetime64[M]")
+    intervalo = "ano" if int((meses[-1] - meses[0]).astype(np.int64)) >= MESES_MAXIMOS_SERIE_PREMIOS else "mês"
+    chaves = dias.astype("datetime64[Y]") if intervalo == "ano" else meses
+
+    inicios = i + np.concatenate([[0], np.flatnonzero(chaves[1:] != chaves[:-1]) + 1])
+    fins = np.append(inicios[1:], j)
+    serie = []
+    for ini, fim in zip(inicios, fins):
+        soma = acumulada[fim] - acumulada[ini]
+        serie.append({
+            "periodo": str(chaves[ini - i]),
+            "concursos": int(fim - ini),
+            "media": np.divide(soma[0], soma[2], out=np.zeros(FAIXAS), where=soma[2] > 0).tolist(),
+            "ganhadores": (soma[1] / (fim - ini)).tolist(),
+        })
+    return intervalo, serie
+
+
+def probabilidade_acertos(acertos: int) -> float:
+    """
+    Chance de uma aposta simples (15 dezenas) ter exatamente esse número de acertos.
+    """
+    return math.comb(15, acertos) * math.comb(10, 15 - acertos) / math.comb(25, 15)
+
 
-            except Exception:
-                continue
+def retorno_esperado(premio_medio: List[float], qtd_dezenas: int = 15) -> float:
+    """
+    Valor esperado por concurso de uma aposta, usando o prêmio médio histórico
+    de cada faixa. Uma aposta de k dezenas vale C(k, 15) apostas simples.
+    """
+    simples = sum(probabilidade_acertos(16 - faixa) * premio_medio[faixa - 1] for faixa in range(1, FAIXAS + 1))
+    return math.comb(qtd_dezenas, 15) * simples
 
-    except Exception as e:
-        st.error(f"Erro na busca de frequências: {e}")
-        return freq, 0
 
-    return freq, concursos_encontrados
+def exibir_estatisticas_de_premios(estatisticas: Dict[str, Any], chave: str):
+    st.caption(
+        f"Prêmios pagos em {estatisticas['concursos']} concurso(s) do período "
+        "(média e mediana só dos concursos em que a faixa teve ganhador)."
+    )
+    st.dataframe(
+        [
+            {
+                "Acertos": 16 - faixa,
+                "Prêmio médio": formatar_moeda_br(estatisticas["media"][faixa - 1]),
+                "Prêmio mediano": formatar_moeda_br(estatisticas["mediana"][faixa - 1]),
+                "Ganhadores por concurso": f"{estatisticas['ganhadores'][faixa - 1]:,.0f}".replace(",", "."),
+                "Chance (aposta simples)": f"1 em {1 / probabilidade_acertos(16 - faixa):,.0f}".replace(",", "."),
+            }
+            for faixa in range(1, FAIXAS + 1)
+        ],
+        hide_index=True,
+    )
+
+    serie = estatisticas.get("serie") or []
+    if len(serie) < 2:
+        return
+
+    acertos = st.selectbox(
+        f"Evolução por {estatisticas['intervalo']}",
+        options=list(range(15, 10, -1)),
+        format_func=lambda a: f"{a} acertos",
+        key=f"{chave}_premios_faixa",
+    )
+    faixa = 16 - acertos
+    periodos = [ponto["periodo"] for ponto in serie]
+    g1, g2 = st.columns(2)
+    with g1:
+        st.line_chart(
+            {"Período": periodos, "Prêmio médio (R$)": [ponto["media"][faixa - 1] for ponto in serie]},
+            x="Período",
+            height=220,
+        )
+    with g2:
+        st.line_chart(
+            {"Período": periodos, "Ganhadores por concurso": [ponto["ganhadores"][faixa - 1] for ponto in serie]},
+            x="Período",
+            height=220,
+        )
+
+
+def ordenar_dias(totais_por_dia: Dict[str, float]) -> List[str]:
+    return sorted(totais_por_dia.keys(), key=lambda x: datetime.strptime(x, "%d/%m/%Y"))
 
 
 def montar_jogo_por_frequencia(freq: Dict[int, int], qtd_dezenas: int, modo: str) -> List[int]:
@@ -693,32 +1685,658 @@ def montar_jogos_16_9(freq: Dict[int, int]) -> Tuple[List[int], List[int]]:
     return sorted(mais_sorteados), sorted(menos_sorteados)
 
 
-# --- TELA INICIAL DE SELEÇÃO DE TEMA ---
-if "tema_selecionado" not in st.session_state:
-    st.session_state["tema_selecionado"] = None
+@st.cache_resource
+def obter_indice_combinacoes() -> IndiceCombinacoes:
+    # Montado uma vez por processo (~30 MB) e dividido entre as sessões
+    return IndiceCombinacoes()
 
-if st.session_state["tema_selecionado"] is None:
-    st.markdown(
-        """
-        <div style="text-align: center; padding: 2rem;">
-          <h1>🎯 Lotofácil 2026</h1>
-          <p style="font-size: 1.2rem; margin: 1rem 0;">Qual aparência você deseja usar?</p>
-        </div>
-        """,
-        unsafe_allow_html=True,
+
+def montar_jogos_filtrados(
+        freq: Dict[int, int],
+        restricoes: Restricoes,
+        quantidade: int,
+        ineditos: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Melhores apostas de 15 dezenas (por frequência no período) entre todas as
+    combinações que atendem às restrições, inclusive repetidas do último concurso.
+    Com ineditos, descarta as que já saíram em algum concurso gravado.
+    """
+    return melhores_jogos(
+        obter_indice_combinacoes(),
+        freq,
+        restricoes,
+        mascara_ultimo=buscar_concurso(None).mascara,
+        quantidade=quantidade,
+        sorteadas=obter_historico().sorteios_ocorridos() if ineditos else None,
     )
 
-    col1, col2 = st.columns(2)
-    with col1:
-        if st.button("☀️ Claro", type="primary", use_container_width=True):
-            st.session_state["tema_selecionado"] = "Claro"
-            st.rerun()
-    with col2:
-        if st.button("🌙 Escuro", type="primary", use_container_width=True):
-            st.session_state["tema_selecionado"] = "Escuro"
-            st.rerun()
 
-    st.stop()
+def finalizar_analise(busca: Dict[str, Any]):
+    """
+    Monta os jogos a partir da frequência lida (completa ou parcial) e guarda
+    o resultado no session_state para sobreviver aos reruns.
+    """
+    freq = busca["freq"]
+    resultado: Dict[str, Any] = {
+        "encontrados": busca["encontrados"],
+        "periodo_txt": f"{busca['ini'].strftime('%d/%m/%Y')} a {busca['fim'].strftime('%d/%m/%Y')}",
+        "periodo": (busca["ini"], busca["fim"]),
+        "qtd_dezenas": busca["qtd_dezenas"],
+        "parcial": busca["status"] != "concluida",
+        "faltando": sorted(busca["faltando"]),
+        "premios": estatisticas_de_premios(busca["ini"], busca["fim"]),
+    }
+
+    if busca["encontrados"] > 0:
+        if busca["modo"] == "16_9":
+            resultado["jogos"] = montar_jogos_16_9(freq)
+        elif busca["modo"] == "filtros":
+            resultado["jogos"] = montar_jogos_filtrados(
+                freq, busca["restricoes"], busca["qtd_jogos"], busca.get("ineditos", False)
+            )
+        else:
+            qtd = busca["qtd_dezenas"]
+            resultado["jogos"] = (
+                montar_jogo_por_frequencia(freq, qtd_dezenas=qtd, modo="mais"),
+                montar_jogo_por_frequencia(freq, qtd_dezenas=qtd, modo="menos"),
+                montar_jogo_combinado(freq, qtd_dezenas=qtd),
+            )
+
+    st.session_state[f"analise_resultado_{busca['modo']}"] = resultado
+
+
+def nova_busca_analise(modo: str, dt_ini: date, dt_fim: date, qtd_dezenas: int) -> Dict[str, Any]:
+    return {
+        "status": "andamento",
+        "modo": modo,
+        "ini": dt_ini,
+        "fim": dt_fim,
+        "qtd_dezenas": qtd_dezenas,
+        "freq": {i: 0 for i in range(1, 26)},
+        "encontrados": 0,
+        "faltando": [],
+        "proximo_num": None,
+        "estimativa": estimar_concursos_no_periodo(dt_ini, dt_fim),
+    }
+
+
+def executar_analise(busca: Dict[str, Any]):
+    """
+    Executa (ou retoma, a partir de busca["proximo_num"]) a leitura do período.
+    """
+    busca["status"] = "andamento"
+    st.session_state["analise_busca"] = busca
+
+    if busca["proximo_num"] is None:
+        rapido = frequencia_pelo_indice(busca["ini"], busca["fim"])
+        if rapido is not None:
+            busca["freq"], busca["encontrados"] = rapido
+            busca["status"] = "concluida"
+            finalizar_analise(busca)
+            return
+
+    progresso = st.progress(0.0, text="Lendo concursos do período e calculando frequências...")
+    grafico = st.empty()
+    ultima_tela = 0.0
+
+    for num, freq, encontrados in iterar_frequencia_no_periodo(
+            busca["ini"], busca["fim"], busca["proximo_num"], busca["freq"], busca["encontrados"], busca["faltando"]
+    ):
+        busca["proximo_num"] = num - 1
+        busca["freq"] = freq
+        busca["encontrados"] = encontrados
+
+        agora = time.monotonic()
+        if agora - ultima_tela >= INTERVALO_ATUALIZACAO_TELA_S:
+            ultima_tela = agora
+            progresso.progress(
+                min(1.0, encontrados / busca["estimativa"]),
+                text=f"Concurso {num}: {encontrados} de ~{busca['estimativa']} concursos lidos{texto_limitador()}",
+            )
+            grafico.bar_chart({"Frequência parcial": [freq[d] for d in range(1, 26)]})
+
+    progresso.empty()
+    grafico.empty()
+    busca["status"] = "concluida"
+    finalizar_analise(busca)
+
+
+def recalcular_totais_por_dia():
+    """
+    Reconstrói os totais por dia a partir dos totais por concurso (sem rede).
+    """
+    totais_fixos_por_dia: Dict[str, float] = {}
+    totais_extras_por_dia: Dict[str, float] = {}
+    for dt_concurso, total_fixos, total_extras in st.session_state.get("hist_por_concurso", {}).values():
+        chave = dt_concurso.strftime("%d/%m/%Y")
+        totais_fixos_por_dia[chave] = totais_fixos_por_dia.get(chave, 0.0) + total_fixos
+        totais_extras_por_dia[chave] = totais_extras_por_dia.get(chave, 0.0) + total_extras
+
+    st.session_state["hist_fixos"] = totais_fixos_por_dia
+    st.session_state["hist_extras"] = totais_extras_por_dia
+    st.session_state["hist_dias"] = ordenar_dias(totais_fixos_por_dia)
+
+
+def planejar_busca_historico(dt_ini: date, dt_fim: date) -> Dict[str, Any]:
+    """
+    Reaproveita os concursos já somados: descarta os que saíram do período e
+    agenda apenas os trechos novos (antes e/ou depois do período já coberto).
+    """
+    por_concurso: Dict[int, Tuple[date, float, float]] = st.session_state.setdefault("hist_por_concurso", {})
+    faltando: set = st.session_state.setdefault("hist_faltando", set())
+    cobertura: Optional[Tuple[date, date]] = st.session_state.get("hist_cobertura")
+
+    for num in [n for n, (d, _, _) in por_concurso.items() if not dt_ini <= d <= dt_fim]:
+        del por_concurso[num]
+
+    # Concursos que faltaram antes e já foram repostos em segundo plano entram sem rede
+    historico = obter_historico()
+    for num in sorted(faltando):
+        concurso = historico.concurso(num)
+        if concurso is None:
+            continue
+        faltando.discard(num)
+        if dt_ini <= concurso.data <= dt_fim:
+            por_concurso[num] = (concurso.data, concurso.total_por_grupo(GAMES), concurso.total_por_grupo(EXTRA_GAMES))
+
+    trechos: List[Dict[str, Any]] = []
+    if cobertura and cobertura[0] <= dt_fim and cobertura[1] >= dt_ini:
+        cob_ini, cob_fim = max(cobertura[0], dt_ini), min(cobertura[1], dt_fim)
+        if dt_fim > cob_fim:
+            trechos.append({"ini": cob_fim + timedelta(days=1), "fim": dt_fim, "proximo_num": None})
+        if dt_ini < cob_ini:
+            # Começa logo abaixo do menor concurso já coberto, sem reler o meio
+            cobertos = [n for n, (d, _, _) in por_concurso.items() if d >= cob_ini]
+            trechos.append({
+                "ini": dt_ini,
+                "fim": cob_ini - timedelta(days=1),
+                "proximo_num": min(cobertos) - 1 if cobertos else None,
+            })
+        st.session_state["hist_cobertura"] = (cob_ini, cob_fim)
+    else:
+        por_concurso.clear()
+        faltando.clear()
+        trechos.append({"ini": dt_ini, "fim": dt_fim, "proximo_num": None})
+        st.session_state["hist_cobertura"] = None
+
+    recalcular_totais_por_dia()
+
+    # A cobertura só vai até o concurso mais recente que existe agora: dias
+    # depois dele (sorteio ainda não publicado) são replanejados na próxima busca
+    _ultimo_num, dt_ultimo = obter_ultimo_concurso()
+
+    return {
+        "status": "andamento",
+        "ini": dt_ini,
+        "fim": dt_fim,
+        "coberto_ate": min(dt_fim, dt_ultimo),
+        "trechos": trechos,
+        "feitos": 0,
+        "estimativa": max(1, sum(estimar_concursos_no_periodo(t["ini"], t["fim"]) for t in trechos)),
+    }
+
+
+def executar_busca_historico(busca: Dict[str, Any]):
+    """
+    Executa (ou retoma) os trechos pendentes da busca, somando os prêmios por
+    concurso. Os totais parciais ficam no session_state desde o início.
+    """
+    por_concurso: Dict[int, Tuple[date, float, float]] = st.session_state.setdefault("hist_por_concurso", {})
+    totais_fixos_por_dia: Dict[str, float] = st.session_state.setdefault("hist_fixos", {})
+    totais_extras_por_dia: Dict[str, float] = st.session_state.setdefault("hist_extras", {})
+    faltando: set = st.session_state.setdefault("hist_faltando", set())
+    busca["status"] = "andamento"
+
+    progresso = st.progress(0.0, text="Buscando histórico na Caixa...")
+    parcial = st.empty()
+    ultima_tela = 0.0
+
+    while busca["trechos"]:
+        trecho = busca["trechos"][0]
+        for num, concurso, erro in iterar_concursos_no_periodo(trecho["ini"], trecho["fim"], trecho["proximo_num"]):
+            trecho["proximo_num"] = num - 1
+            if erro is not None:
+                faltando.add(num)
+            elif concurso is not None:
+                faltando.discard(num)
+                if num not in por_concurso:
+                    total_fixos = concurso.total_por_grupo(GAMES)
+                    total_extras = concurso.total_por_grupo(EXTRA_GAMES)
+                    por_concurso[num] = (concurso.data, total_fixos, total_extras)
+
+                    chave = concurso.data.strftime("%d/%m/%Y")
+                    totais_fixos_por_dia[chave] = totais_fixos_por_dia.get(chave, 0.0) + total_fixos
+                    totais_extras_por_dia[chave] = totais_extras_por_dia.get(chave, 0.0) + total_extras
+                    busca["feitos"] += 1
+
+            agora = time.monotonic()
+            if agora - ultima_tela >= INTERVALO_ATUALIZACAO_TELA_S:
+                ultima_tela = agora
+                feitos, estimativa = busca["feitos"], busca["estimativa"]
+                if erro is None and concurso is None:
+                    texto = f"Procurando o início do período: concurso {num}"
+                else:
+                    texto = f"Concurso {num}: {feitos} de ~{estimativa} concursos novos lidos"
+                progresso.progress(min(1.0, feitos / estimativa), text=texto + texto_limitador())
+                parcial.caption(
+                    f"Parcial: {len(totais_fixos_por_dia)} dia(s) · "
+                    f"Fixos {formatar_moeda_br(sum(totais_fixos_por_dia.values()))} · "
+                    f"Extras {formatar_moeda_br(sum(totais_extras_por_dia.values()))}"
+                )
+        busca["trechos"].pop(0)
+
+    busca["status"] = "concluida"
+    if busca["coberto_ate"] >= busca["ini"]:
+        st.session_state["hist_cobertura"] = (busca["ini"], busca["coberto_ate"])
+    else:
+        st.session_state["hist_cobertura"] = None
+    st.session_state["hist_dias"] = ordenar_dias(totais_fixos_por_dia)
+
+    # Mantém marcados os dias de extras que continuam no período
+    dias_set = set(st.session_state["hist_dias"])
+    st.session_state["hist_extras_multiselect"] = [
+        d for d in st.session_state.get("hist_extras_multiselect", []) if d in dias_set
+    ]
+    st.session_state["hist_action"] = None
+
+
+# --- Exportação ---
+COLUNAS_RESULTADO_PERIODO: List[Coluna] = [
+    ("data", "data"),
+    ("jogos_extras", "bool"),
+    ("premios_fixos", "float"),
+    ("premios_extras", "float"),
+    ("custo_extras", "float"),
+    ("bruto", "float"),
+    ("liquido", "float"),
+]
+
+COLUNAS_ACERTOS: List[Coluna] = [
+    ("concurso", "int"),
+    ("data", "data"),
+    ("grupo", "texto"),
+    ("jogo", "int"),
+    ("acertos", "int"),
+    ("premio", "float"),
+]
+
+COLUNAS_FREQUENCIA_ATRASO: List[Coluna] = [
+    ("dezena", "int"),
+    ("frequencia", "int"),
+    ("percentual", "float"),
+    ("atraso_atual", "int"),
+    ("maior_atraso", "int"),
+]
+
+
+def totais_do_dia(
+        dia: str,
+        fixos: Dict[str, float],
+        extras: Dict[str, float],
+        dias_extras: set,
+) -> Tuple[float, float, float, float, float]:
+    """
+    (fixos, extras, custo dos extras, bruto, líquido) de um dia do Histórico.
+    """
+    com_extras = dia in dias_extras
+    total_fixos = fixos.get(dia, 0.0)
+    total_extras = extras.get(dia, 0.0) if com_extras else 0.0
+    custo_extras = VALOR_JOGO_EXTRA * QTD_JOGOS_EXTRAS_DIA if com_extras else 0.0
+    bruto = total_fixos + total_extras
+    return total_fixos, total_extras, custo_extras, bruto, bruto - custo_extras
+
+
+def resumo_mensal_historico(
+        dias: List[str],
+        fixos: Dict[str, float],
+        extras: Dict[str, float],
+        dias_extras: set,
+) -> List[Dict[str, Any]]:
+    """
+    Os totais do Histórico somados por mês (dias em ordem cronológica), para
+    períodos longos demais para um card por dia.
+    """
+    meses: Dict[str, List[float]] = {}
+    for dia in dias:
+        mes = meses.setdefault(dia[3:], [0, 0, 0.0, 0.0, 0.0])
+        mes[0] += 1
+        mes[1] += dia in dias_extras
+        for k, valor in enumerate(totais_do_dia(dia, fixos, extras, dias_extras)[:3], start=2):
+            mes[k] += valor
+    linhas = []
+    for mes, (qtd, qtd_extras, total_fixos, total_extras, custo) in meses.items():
+        linhas.append({
+            "Mês": mes,
+            "Dias": qtd,
+            "Com extras": qtd_extras,
+            "Fixos": formatar_moeda_br(total_fixos),
+            "Extras (prêmios)": formatar_moeda_br(total_extras),
+            "Custo extras": formatar_moeda_br(custo),
+            "Líquido": formatar_moeda_br(total_fixos + total_extras - custo),
+        })
+    return linhas
+
+
+def lotes_resultado_periodo(
+        dias: List[str],
+        fixos: Dict[str, float],
+        extras: Dict[str, float],
+        dias_extras: set,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Totais por dia, com a mesma conta dos cards do Histórico.
+    """
+    for ini in range(0, len(dias), LINHAS_POR_LOTE_EXPORTACAO):
+        lote = dias[ini:ini + LINHAS_POR_LOTE_EXPORTACAO]
+        com_extras = [d in dias_extras for d in lote]
+        premios_fixos = [fixos.get(d, 0.0) for d in lote]
+        premios_extras = [extras.get(d, 0.0) if e else 0.0 for d, e in zip(lote, com_extras)]
+        custo = [VALOR_JOGO_EXTRA * QTD_JOGOS_EXTRAS_DIA if e else 0.0 for e in com_extras]
+        bruto = [f + x for f, x in zip(premios_fixos, premios_extras)]
+        yield {
+            "data": [datetime.strptime(d, "%d/%m/%Y").date().toordinal() for d in lote],
+            "jogos_extras": com_extras,
+            "premios_fixos": premios_fixos,
+            "premios_extras": premios_extras,
+            "custo_extras": custo,
+            "bruto": bruto,
+            "liquido": [b - c for b, c in zip(bruto, custo)],
+        }
+
+
+def lotes_acertos(
+        base: np.ndarray,
+        dt_ini: date,
+        dt_fim: date,
+        grupos: Dict[str, List[List[int]]],
+) -> Iterator[Dict[str, Any]]:
+    """
+    Uma linha por (concurso gravado no período, jogo): acertos e prêmio,
+    calculados em bloco sobre o histórico binário, sem montar Concurso por linha.
+    """
+    jogos = [(grupo, idx, mascara_de_dezenas(jogo)) for grupo, lista in grupos.items() for idx, jogo in enumerate(lista, start=1)]
+    if not jogos:
+        return
+    nomes = np.array([g for g, _idx, _m in jogos], dtype=object)
+    indices = np.array([idx for _g, idx, _m in jogos])
+    mascaras = np.array([m for _g, _idx, m in jogos], dtype=np.uint32)
+
+    i, j = trecho_gravado(base, dt_ini, dt_fim)
+    por_lote = max(1, LINHAS_POR_LOTE_EXPORTACAO // len(jogos))
+    for ini in range(i, j, por_lote):
+        lote = base[ini:min(j, ini + por_lote)]
+        acertos = np.bitwise_count(np.asarray(lote["mascara"])[:, None] & mascaras[None, :])
+        faixa = np.clip(15 - acertos, 0, FAIXAS - 1).astype(np.intp)
+        premio = np.take_along_axis(np.asarray(lote["premio"]), faixa, axis=1)
+        premio[acertos < 11] = 0.0
+        yield {
+            "concurso": np.repeat(lote["numero"], len(jogos)),
+            "data": np.repeat(lote["data"], len(jogos)),
+            "grupo": np.tile(nomes, len(lote)),
+            "jogo": np.tile(indices, len(lote)),
+            "acertos": acertos.ravel(),
+            "premio": premio.ravel(),
+        }
+
+
+def lotes_frequencia_atraso(base: np.ndarray, dt_ini: date, dt_fim: date) -> Iterator[Dict[str, Any]]:
+    """
+    Frequência e atraso (concursos sem sair) de cada dezena no período. Lê o
+    trecho em blocos guardando só a última aparição e o maior atraso.
+    """
+    i, j = trecho_gravado(base, dt_ini, dt_fim)
+    if j <= i:
+        return
+    primeiro, ultimo = int(base["numero"][i]), int(base["numero"][j - 1])
+
+    freq = np.zeros(25, dtype=np.int64)
+    visto = np.full(25, primeiro - 1, dtype=np.int64)  # última aparição (número do concurso)
+    maior = np.zeros(25, dtype=np.int64)
+    for ini in range(i, j, LINHAS_POR_LOTE_EXPORTACAO):
+        lote = base[ini:min(j, ini + LINHAS_POR_LOTE_EXPORTACAO)]
+        numeros = np.asarray(lote["numero"], dtype=np.int64)
+        bits = ((np.asarray(lote["mascara"])[:, None] >> np.arange(25, dtype=np.uint32)) & 1).astype(bool)
+        freq += bits.sum(axis=0)
+        for d in range(25):
+            saidas = numeros[bits[:, d]]
+            if len(saidas):
+                maior[d] = max(maior[d], int(np.diff(saidas, prepend=visto[d]).max()) - 1)
+                visto[d] = saidas[-1]
+
+    atraso = ultimo - visto
+    yield {
+        "dezena": np.arange(1, 26),
+        "frequencia": freq,
+        "percentual": np.round(100.0 * freq / (j - i), 2),
+        "atraso_atual": atraso,
+        "maior_atraso": np.maximum(maior, atraso),
+    }
+
+
+def botao_exportacao(
+        rotulo: str,
+        nome_arquivo: str,
+        formato: str,
+        colunas: List[Coluna],
+        gerar_lotes: Callable[[], Iterator[Dict[str, Any]]],
+        key: str,
+):
+    """
+    O arquivo só é gerado no clique (em outra thread), lote a lote, num temporário em disco.
+    gerar_lotes lê o histórico no clique, não uma base capturada na renderização.
+    """
+    extensao, mime = FORMATOS_EXPORTACAO[formato]
+    st.download_button(
+        rotulo,
+        data=lambda: exportar_para_bytes(formato, colunas, gerar_lotes()),
+        file_name=f"{nome_arquivo}.{extensao}",
+        mime=mime,
+        key=key,
+    )
+
+
+def selecionar_periodo(prefixo: str) -> Tuple[date, date]:
+    """
+    Datas do período (ou todo o histórico desde 2003, se marcado).
+    """
+    todo_historico = st.checkbox("Todo o histórico (desde 2003)", key=f"{prefixo}_tudo")
+
+    c1, c2 = st.columns(2)
+    with c1:
+        dt_ini = st.date_input(
+            "Data inicial", value=PRIMEIRO_DIA_MES, key=f"{prefixo}_ini", disabled=todo_historico
+        )
+    with c2:
+        dt_fim = st.date_input("Data final", key=f"{prefixo}_fim", disabled=todo_historico)
+
+    if todo_historico:
+        return DATA_PRIMEIRO_CONCURSO, date.today()
+    return dt_ini, dt_fim
+
+
+def manter_estado_dos_widgets(chaves: Tuple[str, ...]):
+    """
+    Seção fechada: o Streamlit apaga, no fim da execução, o estado dos widgets
+    que não foram desenhados. Regravar cada valor como estado comum da sessão
+    o preserva, e o widget volta igual quando a seção reabre.
+    """
+    for chave in chaves:
+        if chave in st.session_state:
+            st.session_state[chave] = st.session_state[chave]
+
+
+def pode_retomar(busca: Optional[Dict[str, Any]], dt_ini: date, dt_fim: date) -> bool:
+    if not (busca and busca["status"] == "cancelada" and busca["ini"] == dt_ini and busca["fim"] == dt_fim):
+        return False
+    trechos = busca.get("trechos", [busca])
+    return any(t["proximo_num"] is None or t["proximo_num"] >= 1 for t in trechos)
+
+
+def exibir_aviso_faltando(faltando: List[int], acao: str):
+    """
+    Avisa que o período está incompleto. Os concursos que faltaram seguem na
+    fila de reposição; quando já estão no histórico, basta repetir a ação.
+    """
+    if not faltando:
+        return
+    historico = obter_historico()
+    pendentes = [n for n in faltando if historico.concurso(n) is None]
+    if not pendentes:
+        st.info(f"Os {len(faltando)} concurso(s) que faltavam já foram carregados: {acao} de novo para incluí-los.")
+        return
+
+    lista = ", ".join(str(n) for n in sorted(pendentes, reverse=True)[:10])
+    if len(pendentes) > 10:
+        lista += ", ..."
+    st.warning(
+        f"Período incompleto: {len(pendentes)} concurso(s) não carregaram ({lista}). "
+        f"Eles estão sendo buscados de novo em segundo plano; {acao} daqui a pouco para completar."
+    )
+
+
+def exibir_aviso_parcial(resultado: Dict[str, Any]):
+    if resultado["parcial"]:
+        st.info(f"Busca interrompida: jogos calculados com {resultado['encontrados']} concurso(s) já lidos.")
+    exibir_aviso_faltando(resultado.get("faltando", []), "gere os jogos")
+
+
+# --- Administração ---
+def admin_autorizado() -> bool:
+    informado = st.query_params.get("admin", "")
+    return bool(TOKEN_ADMIN) and hmac.compare_digest(informado.encode("utf-8"), TOKEN_ADMIN.encode("utf-8"))
+
+
+# --- Perfil sob demanda ---
+def perfil_ligado() -> bool:
+    # O perfil custa CPU e memória do servidor: só com o token de administração na URL
+    pedido = st.query_params.get("perfil") == "1" or bool(st.session_state.get("admin_perfil"))
+    return pedido and admin_autorizado()
+
+
+def iniciar_perfil():
+    """
+    Liga o perfil desta execução. Uma execução que não chega ao fim do script
+    (st.rerun() ou um clique no meio) tem o perfil fechado aqui, na seguinte,
+    que roda na mesma thread. Se a sessão acaba antes, a amostragem para junto
+    com a thread do script.
+    """
+    concluir_perfil(interrompida=True)
+    if not perfil_ligado():
+        return
+
+    ctx = get_script_run_ctx()
+    perfil = PerfilExecucao(
+        INTERVALO_AMOSTRAGEM_PERFIL_S,
+        # add_script_run_ctx marca com o contexto da sessão as threads dos pools de consulta
+        filtro_thread=lambda thread: getattr(thread, "streamlit_script_run_ctx", None) is ctx,
+    )
+    st.session_state["perfil_em_andamento"] = perfil
+    perfil.iniciar()
+
+
+def concluir_perfil(interrompida: bool = False):
+    perfil: Optional[PerfilExecucao] = st.session_state.pop("perfil_em_andamento", None)
+    if perfil is None:
+        return
+    perfil.parar()
+
+    ident = st.session_state.get("perfis_gerados", 0) + 1
+    st.session_state["perfis_gerados"] = ident
+    relatorios: List[Dict[str, Any]] = st.session_state.setdefault("perfis", [])
+    relatorios.insert(0, {
+        "id": ident,
+        "quando": datetime.now().strftime("%H:%M:%S"),
+        "duracao_s": perfil.duracao_s,
+        "interrompida": interrompida,
+        "resumo": perfil.resumo(FUNCOES_PERFILADAS),
+        "mais_demoradas": perfil.mais_demoradas(),
+        "prof": perfil.dados_prof(),
+        "pilhas": perfil.pilhas_colapsadas(),
+    })
+    del relatorios[PERFIS_GUARDADOS:]
+
+
+def _ms(segundos: float) -> str:
+    return f"{segundos * 1000:.1f} ms"
+
+
+def exibir_perfis():
+    relatorios = {r["id"]: r for r in st.session_state.get("perfis", [])}
+    if not relatorios:
+        return
+
+    with st.expander("⏱️ Perfil das execuções", expanded=False):
+        escolhido = st.selectbox(
+            "Execução",
+            options=list(relatorios),
+            format_func=lambda i: (
+                f"#{i} às {relatorios[i]['quando']} · {relatorios[i]['duracao_s']:.2f} s"
+                + (" · interrompida (rerun)" if relatorios[i]["interrompida"] else "")
+            ),
+            key="perfil_escolhido",
+        )
+        relatorio = relatorios[escolhido]
+
+        st.caption(
+            "Funções do app. cProfile: thread do script e leituras de concursos em paralelo; "
+            "amostragem: tempo somado de todas as threads da sessão."
+        )
+        st.dataframe(
+            [
+                {
+                    "Função": linha["funcao"],
+                    "Chamadas": linha["chamadas"],
+                    "Tempo próprio": _ms(linha["proprio_s"]),
+                    "Tempo total": _ms(linha["total_s"]),
+                    "Amostrado (soma das threads)": _ms(linha["amostrado_s"]),
+                }
+                for linha in relatorio["resumo"]
+                if linha["chamadas"] or linha["amostrado_s"]
+            ],
+            hide_index=True,
+        )
+
+        st.caption("Maior tempo total (cProfile):")
+        st.dataframe(
+            [
+                {
+                    "Função": linha["funcao"],
+                    "Chamadas": linha["chamadas"],
+                    "Tempo próprio": _ms(linha["proprio_s"]),
+                    "Tempo total": _ms(linha["total_s"]),
+                }
+                for linha in relatorio["mais_demoradas"]
+            ],
+            hide_index=True,
+        )
+
+        col_prof, col_pilhas = st.columns(2)
+        with col_prof:
+            st.download_button(
+                "Baixar estatísticas (.prof)",
+                data=lambda: relatorio["prof"],
+                file_name=f"lotofacil-perfil-{relatorio['id']}.prof",
+                mime="application/octet-stream",
+                disabled=not relatorio["prof"],
+                key="perfil_baixar_prof",
+            )
+        with col_pilhas:
+            st.download_button(
+                "Baixar pilhas para flamegraph",
+                data=lambda: relatorio["pilhas"],
+                file_name=f"lotofacil-perfil-{relatorio['id']}.folded",
+                mime="text/plain",
+                key="perfil_baixar_pilhas",
+            )
+        st.caption(
+            "O .prof abre com `python -m pstats` ou snakeviz; o .folded com flamegraph.pl, "
+            "speedscope ou inferno."
+        )
+
+
+# --- Perfil da execução (até o fim do script) ---
+iniciar_perfil()
 
 # --- Aplicar tema selecionado ---
 modo_visual = st.session_state["tema_selecionado"]
@@ -741,6 +2359,9 @@ if st.button("Alternar Tema", key="theme_toggle_btn", help="Clique para alternar
     st.session_state["tema_selecionado"] = "Escuro" if modo_visual == "Claro" else "Claro"
     st.rerun()
 
+# Aviso de limitação de taxa pela Caixa (compartilhado entre sessões)
+exibir_status_limitador()
+
 # --- Conferência ---
 with st.container(border=True):
     st.subheader("Conferência do concurso")
@@ -763,26 +2384,19 @@ with st.container(border=True):
         with st.spinner("Buscando dados do concurso na Caixa..."):
             try:
                 concurso_num = None if use_ultimo else int(concurso)
-                data = buscar_resultado(concurso_num)
-                sorteadas = extrair_dezenas_sorteadas(data)
-
-                numero_concurso = data.get("numero") or data.get("numeroConcurso") or (
-                    concurso_num if concurso_num else "N/A"
-                )
-                data_apuracao = data.get("dataApuracao") or data.get("data") or "N/A"
+                resultado_concurso = buscar_concurso(concurso_num)
 
                 with st.container(border=True):
-                    st.subheader(f"Concurso {numero_concurso}")
-                    st.caption(f"Data: {data_apuracao}")
+                    st.subheader(f"Concurso {resultado_concurso.numero}")
+                    st.caption(f"Data: {resultado_concurso.data.strftime('%d/%m/%Y')}")
                     st.write("**Dezenas sorteadas:**")
-                    render_chips(sorteadas, variant="default")
+                    render_chips(list(resultado_concurso.dezenas), variant="default")
 
                 total = 0.0
                 total += exibir_conferencia_de_jogos(
                     titulo_bloco="Jogos Fixos",
                     jogos=GAMES,
-                    sorteadas=sorteadas,
-                    data=data,
+                    concurso=resultado_concurso,
                     prefixo_nome="Jogo",
                 )
 
@@ -791,8 +2405,7 @@ with st.container(border=True):
                         total += exibir_conferencia_de_jogos(
                             titulo_bloco="Conferência dos Jogos Extras",
                             jogos=EXTRA_GAMES,
-                            sorteadas=sorteadas,
-                            data=data,
+                            concurso=resultado_concurso,
                             prefixo_nome="Jogo Extra",
                         )
 
@@ -804,261 +2417,506 @@ with st.container(border=True):
                 st.error(f"Erro: {e}")
 
 # --- Histórico ---
-with st.expander("📅 Histórico", expanded=False):
-    c1, c2 = st.columns(2)
-    with c1:
-        dt_ini = st.date_input("Data inicial", value=PRIMEIRO_DIA_MES, key="hist_ini")
-    with c2:
-        dt_fim = st.date_input("Data final", key="hist_fim")
-
-    st.caption("Primeiro pesquise o período. Depois selecione os dias dos **Jogos Extras**.")
-
-    top_actions = st.columns(2)
-    with top_actions[0]:
-        pesquisar = st.button("Pesquisar histórico")
-    with top_actions[1]:
-        limpar_hist = st.button("Limpar resultados do histórico")
-
-    if limpar_hist:
-        for k in [
-            "hist_dias",
-            "hist_fixos",
-            "hist_extras",
-            "hist_extras_multiselect",
-            "hist_action",
-        ]:
-            if k in st.session_state:
-                del st.session_state[k]
-        st.rerun()
-
-    if pesquisar:
-        if dt_ini > dt_fim:
-            st.error("A **Data inicial** não pode ser maior que a **Data final**.")
-        else:
-            with st.spinner("Buscando histórico na Caixa..."):
-                try:
-                    data_ultimo = buscar_resultado(None)
-                    ultimo_num = int(data_ultimo.get("numero") or data_ultimo.get("numeroConcurso"))
-
-                    totais_fixos_por_dia: Dict[str, float] = {}
-                    totais_extras_por_dia: Dict[str, float] = {}
-
-                    limite_concursos = 700
-                    verificados = 0
-
-                    for num in range(ultimo_num, 0, -1):
-                        if verificados >= limite_concursos:
-                            st.warning(f"Limite de {limite_concursos} concursos atingido. Parando a busca.")
-                            break
-
-                        verificados += 1
-
-                        try:
-                            data = buscar_resultado(num)
-                            dt_concurso = parse_data_concurso(data)
-
-                            if dt_concurso < dt_ini:
-                                break
-
-                            if dt_ini <= dt_concurso <= dt_fim:
-                                sorteadas = extrair_dezenas_sorteadas(data)
-
-                                total_fixos = total_por_grupo(data, sorteadas, GAMES)
-                                total_extras = total_por_grupo(data, sorteadas, EXTRA_GAMES)
-
-                                chave = dt_concurso.strftime("%d/%m/%Y")
-                                totais_fixos_por_dia[chave] = totais_fixos_por_dia.get(chave, 0.0) + total_fixos
-                                totais_extras_por_dia[chave] = totais_extras_por_dia.get(chave, 0.0) + total_extras
-
-                        except Exception:
-                            continue
+# Seções só são montadas quando abertas (o expander rastreia o estado e dá rerun);
+# fechadas, guardam o valor dos seus widgets
+secao_historico = st.expander("📅 Histórico", expanded=False, key="secao_historico", on_change="rerun")
+if not secao_historico.open:
+    manter_estado_dos_widgets(WIDGETS_HISTORICO)
+with secao_historico:
+    if secao_historico.open:
+        dt_ini, dt_fim = selecionar_periodo("hist")
+
+        st.caption("Primeiro pesquise o período. Depois selecione os dias dos **Jogos Extras**.")
+
+        top_actions = st.columns(3)
+        with top_actions[0]:
+            pesquisar = st.button("Pesquisar histórico")
+        with top_actions[1]:
+            st.button("Cancelar busca", key="hist_cancelar")
+        with top_actions[2]:
+            limpar_hist = st.button("Limpar resultados do histórico")
+
+        if limpar_hist:
+            for k in [
+                "hist_dias",
+                "hist_fixos",
+                "hist_extras",
+                "hist_por_concurso",
+                "hist_cobertura",
+                "hist_faltando",
+                "hist_busca",
+                "hist_extras_multiselect",
+                "hist_action",
+            ]:
+                if k in st.session_state:
+                    del st.session_state[k]
+            st.rerun()
 
-                    dias_disponiveis = sorted(
-                        totais_fixos_por_dia.keys(),
-                        key=lambda x: datetime.strptime(x, "%d/%m/%Y"),
-                    )
+        # Uma busca que ficou "em andamento" foi interrompida (Cancelar ou outro clique):
+        # mantém o que já foi lido como resultado parcial, pronto para ser retomado.
+        busca_hist = st.session_state.get("hist_busca")
+        if busca_hist and busca_hist["status"] == "andamento":
+            busca_hist["status"] = "cancelada"
+            st.session_state["hist_dias"] = ordenar_dias(st.session_state.get("hist_fixos", {}))
+            dias_set = set(st.session_state["hist_dias"])
+            st.session_state["hist_extras_multiselect"] = [
+                d for d in st.session_state.get("hist_extras_multiselect", []) if d in dias_set
+            ]
+            st.session_state["hist_action"] = None
 
-                    st.session_state["hist_dias"] = dias_disponiveis
-                    st.session_state["hist_fixos"] = totais_fixos_por_dia
-                    st.session_state["hist_extras"] = totais_extras_por_dia
+        continuar_hist = False
+        if busca_hist and busca_hist["status"] == "cancelada":
+            st.info(
+                f"Busca interrompida: resultados parciais com {busca_hist['feitos']} "
+                f"de ~{busca_hist['estimativa']} concursos."
+            )
+            if pode_retomar(busca_hist, dt_ini, dt_fim):
+                continuar_hist = st.button("Continuar busca", key="hist_continuar")
 
-                    st.session_state["hist_extras_multiselect"] = []
-                    st.session_state["hist_action"] = None
+        if pesquisar or continuar_hist:
+            if dt_ini > dt_fim:
+                st.error("A **Data inicial** não pode ser maior que a **Data final**.")
+            else:
+                try:
+                    if pesquisar:
+                        # Só os dias que entraram no período são lidos; o resto é reaproveitado
+                        busca_hist = planejar_busca_historico(dt_ini, dt_fim)
+                        st.session_state["hist_busca"] = busca_hist
 
+                    executar_busca_historico(busca_hist)
                     st.rerun()
 
                 except Exception as e:
+                    if busca_hist:
+                        busca_hist["status"] = "cancelada"
+                        st.session_state["hist_dias"] = ordenar_dias(st.session_state.get("hist_fixos", {}))
                     st.error(f"Erro ao pesquisar histórico: {e}")
 
-    if st.session_state.get("hist_dias"):
-        dias = st.session_state["hist_dias"]
-        fixos = st.session_state["hist_fixos"]
-        extras = st.session_state["hist_extras"]
-
-        action = st.session_state.get("hist_action")
-        if action == "select_all":
-            st.session_state["hist_extras_multiselect"] = list(dias)
-            st.session_state["hist_action"] = None
-            st.rerun()
-        elif action == "clear":
-            st.session_state["hist_extras_multiselect"] = []
-            st.session_state["hist_action"] = None
-            st.rerun()
-
-        st.subheader("Selecionar dias com Jogos Extras")
+        if st.session_state.get("hist_dias"):
+            dias = st.session_state["hist_dias"]
+            fixos = st.session_state["hist_fixos"]
+            extras = st.session_state["hist_extras"]
 
-        sel_actions = st.columns(2)
-        with sel_actions[0]:
-            if st.button("Marcar todos"):
-                st.session_state["hist_action"] = "select_all"
+            action = st.session_state.get("hist_action")
+            if action == "select_all":
+                st.session_state["hist_extras_multiselect"] = list(dias)
+                st.session_state["hist_action"] = None
                 st.rerun()
-        with sel_actions[1]:
-            if st.button("Limpar seleção"):
-                st.session_state["hist_action"] = "clear"
+            elif action == "clear":
+                st.session_state["hist_extras_multiselect"] = []
+                st.session_state["hist_action"] = None
                 st.rerun()
 
-        selecionados = st.multiselect(
-            "Marque os dias dos Jogos Extras:",
-            options=dias,
-            key="hist_extras_multiselect",
-        )
-        dias_extras_set = set(selecionados)
+            st.subheader("Selecionar dias com Jogos Extras")
 
-        st.subheader("Resultado no período")
+            sel_actions = st.columns(2)
+            with sel_actions[0]:
+                if st.button("Marcar todos"):
+                    st.session_state["hist_action"] = "select_all"
+                    st.rerun()
+            with sel_actions[1]:
+                if st.button("Limpar seleção"):
+                    st.session_state["hist_action"] = "clear"
+                    st.rerun()
 
-        total_periodo = 0.0
+            selecionados = st.multiselect(
+                "Marque os dias dos Jogos Extras:",
+                options=dias,
+                key="hist_extras_multiselect",
+            )
+            dias_extras_set = set(selecionados)
 
-        cols_per_row = 2
-        cols = st.columns(cols_per_row)
+            st.subheader("Resultado no período")
+            exibir_aviso_faltando(sorted(st.session_state.get("hist_faltando", ())), "pesquise")
 
-        for i, dia in enumerate(dias):
-            total_fixos = fixos.get(dia, 0.0)
-            total_extras = extras.get(dia, 0.0) if dia in dias_extras_set else 0.0
+            total_periodo = sum(totais_do_dia(dia, fixos, extras, dias_extras_set)[4] for dia in dias)
 
-            custo_extras = (VALOR_JOGO_EXTRA * QTD_JOGOS_EXTRAS_DIA) if dia in dias_extras_set else 0.0
+            if len(dias) > DIAS_MAXIMOS_EM_CARTOES:
+                # Um card por dia em períodos longos seriam milhares de elementos a cada rerun
+                st.caption(
+                    f"{len(dias)} dias no período: resumo por mês. "
+                    "O detalhe de cada dia sai em **Exportar → Resultado por dia**."
+                )
+                st.dataframe(resumo_mensal_historico(dias, fixos, extras, dias_extras_set), hide_index=True)
+                dias_em_cartoes: List[str] = []
+            else:
+                dias_em_cartoes = dias
 
-            total_dia_bruto = total_fixos + total_extras
-            total_dia_liquido = total_dia_bruto - custo_extras
-            total_periodo += total_dia_liquido
+            cols_per_row = 2
+            cols = st.columns(cols_per_row) if dias_em_cartoes else []
 
-            col = cols[i % cols_per_row]
-            with col:
-                with st.container(border=True):
-                    left, right = st.columns([1.2, 1])
-                    with left:
-                        st.markdown(f"### {dia}")
-                        st.caption("Extras: ✅" if dia in dias_extras_set else "Extras: —")
-                    with right:
-                        st.metric("Total do dia (líquido)", formatar_moeda_br(total_dia_liquido))
-
-                    det1, det2 = st.columns(2)
-                    with det1:
-                        st.caption(f"Fixos: {formatar_moeda_br(total_fixos)}")
-                        st.caption(f"Custo extras: {formatar_moeda_br(custo_extras)}")
-                    with det2:
-                        st.caption(f"Extras (prêmios): {formatar_moeda_br(total_extras)}")
-                        st.caption(f"Bruto: {formatar_moeda_br(total_dia_bruto)}")
-
-            if (i + 1) % cols_per_row == 0 and (i + 1) < len(dias):
-                cols = st.columns(cols_per_row)
-
-        st.subheader("Total no período")
-        st.metric("Total (líquido)", formatar_moeda_br(total_periodo))
+            for i, dia in enumerate(dias_em_cartoes):
+                total_fixos, total_extras, custo_extras, total_dia_bruto, total_dia_liquido = totais_do_dia(
+                    dia, fixos, extras, dias_extras_set
+                )
+
+                col = cols[i % cols_per_row]
+                with col:
+                    with st.container(border=True):
+                        left, right = st.columns([1.2, 1])
+                        with left:
+                            st.markdown(f"### {dia}")
+                            st.caption("Extras: ✅" if dia in dias_extras_set else "Extras: —")
+                        with right:
+                            st.metric("Total do dia (líquido)", formatar_moeda_br(total_dia_liquido))
+
+                        det1, det2 = st.columns(2)
+                        with det1:
+                            st.caption(f"Fixos: {formatar_moeda_br(total_fixos)}")
+                            st.caption(f"Custo extras: {formatar_moeda_br(custo_extras)}")
+                        with det2:
+                            st.caption(f"Extras (prêmios): {formatar_moeda_br(total_extras)}")
+                            st.caption(f"Bruto: {formatar_moeda_br(total_dia_bruto)}")
+
+                if (i + 1) % cols_per_row == 0 and (i + 1) < len(dias_em_cartoes):
+                    cols = st.columns(cols_per_row)
+
+            st.subheader("Total no período")
+            st.metric("Total (líquido)", formatar_moeda_br(total_periodo))
+
+            # Expectativa realista: prêmios médios do próprio período (índice acumulado)
+            estatisticas = estatisticas_de_premios(busca_hist["ini"], busca_hist["fim"]) if busca_hist else None
+            if estatisticas:
+                st.subheader("Prêmios no período")
+                qtd_concursos = len(st.session_state.get("hist_por_concurso", {}))
+
+                c1, c2, c3 = st.columns(3)
+                with c1:
+                    st.metric("Prêmios dos fixos", formatar_moeda_br(sum(fixos.values())))
+                with c2:
+                    st.metric(
+                        "Esperado pela média histórica",
+                        formatar_moeda_br(len(GAMES) * retorno_esperado(estatisticas["media"]) * qtd_concursos),
+                    )
+                with c3:
+                    st.metric("Custo dos fixos", formatar_moeda_br(len(GAMES) * VALOR_APOSTA_SIMPLES * qtd_concursos))
+
+                exibir_estatisticas_de_premios(estatisticas, "hist")
+
+            if busca_hist:
+                st.subheader("Exportar")
+                st.caption("Arquivos gerados no clique, em lotes, a partir do histórico gravado.")
+                formato_hist = st.radio("Formato", options=list(FORMATOS_EXPORTACAO), horizontal=True, key="hist_formato")
+                ini_export, fim_export = busca_hist["ini"], busca_hist["fim"]
+                sufixo = f"{ini_export:%Y%m%d}-{fim_export:%Y%m%d}"
+
+                exp1, exp2, exp3 = st.columns(3)
+                with exp1:
+                    botao_exportacao(
+                        "Resultado por dia",
+                        f"resultado-por-dia-{sufixo}",
+                        formato_hist,
+                        COLUNAS_RESULTADO_PERIODO,
+                        lambda: lotes_resultado_periodo(dias, fixos, extras, dias_extras_set),
+                        key="hist_exportar_dias",
+                    )
+                with exp2:
+                    botao_exportacao(
+                        "Acertos por concurso",
+                        f"acertos-{sufixo}",
+                        formato_hist,
+                        COLUNAS_ACERTOS,
+                        lambda: lotes_acertos(
+                            obter_historico().base(), ini_export, fim_export, {"fixo": GAMES, "extra": EXTRA_GAMES}
+                        ),
+                        key="hist_exportar_acertos",
+                    )
+                with exp3:
+                    botao_exportacao(
+                        "Frequência e atraso",
+                        f"frequencia-atraso-{sufixo}",
+                        formato_hist,
+                        COLUNAS_FREQUENCIA_ATRASO,
+                        lambda: lotes_frequencia_atraso(obter_historico().base(), ini_export, fim_export),
+                        key="hist_exportar_frequencia",
+                    )
 
 # --- Sugestão de jogos ---
-with st.expander("📊 Sugestão de jogos", expanded=False):
-    a1, a2 = st.columns(2)
-    with a1:
-        analise_ini = st.date_input("Data inicial", value=PRIMEIRO_DIA_MES, key="analise_ini")
-    with a2:
-        analise_fim = st.date_input("Data final", key="analise_fim")
-
-    qtd_dezenas = st.radio("Quantidade de dezenas", options=[15, 16], horizontal=True)
-
-    if st.button("Gerar jogos sugeridos"):
-        if analise_ini > analise_fim:
-            st.error("A **Data inicial** não pode ser maior que a **Data final**.")
-        else:
-            with st.spinner("Lendo concursos do período e calculando frequências..."):
-                try:
-                    freq, concursos_encontrados = calcular_frequencia_no_periodo(analise_ini, analise_fim)
+secao_sugestao = st.expander("📊 Sugestão de jogos", expanded=False, key="secao_sugestao", on_change="rerun")
+if not secao_sugestao.open:
+    manter_estado_dos_widgets(WIDGETS_SUGESTAO)
+with secao_sugestao:
+    if secao_sugestao.open:
+        analise_ini, analise_fim = selecionar_periodo("analise")
+
+        qtd_dezenas = st.radio("Quantidade de dezenas", options=[15, 16], horizontal=True, key="analise_qtd_dezenas")
+
+        # Busca que ficou "em andamento" foi interrompida: usa a frequência parcial
+        busca_analise = st.session_state.get("analise_busca")
+        if busca_analise and busca_analise["status"] == "andamento":
+            busca_analise["status"] = "cancelada"
+            finalizar_analise(busca_analise)
+
+        acoes = st.columns(3)
+        with acoes[0]:
+            gerar_sugeridos = st.button("Gerar jogos sugeridos")
+        with acoes[1]:
+            st.button("Cancelar busca", key="analise_cancelar")
+        with acoes[2]:
+            continuar_analise = st.button(
+                "Continuar busca",
+                key="analise_continuar",
+                disabled=not pode_retomar(busca_analise, analise_ini, analise_fim),
+            )
 
-                    if concursos_encontrados == 0:
-                        st.warning("Não encontrei concursos dentro do período selecionado.")
-                    else:
-                        with st.container(border=True):
-                            st.subheader("Resumo da análise")
-                            periodo_txt = f"{analise_ini.strftime('%d/%m/%Y')} a {analise_fim.strftime('%d/%m/%Y')}"
-                            st.markdown(
-                                f'<div class="small-muted"><b>Período:</b> {periodo_txt}</div>',
-                                unsafe_allow_html=True,
-                            )
-
-                            c1, c2 = st.columns(2)
-                            with c1:
-                                st.metric("Quantidade de Concursos", f"{concursos_encontrados}")
-                            with c2:
-                                st.metric("Jogos", f"{qtd_dezenas} dezenas")
-
-                        jogo_mais = montar_jogo_por_frequencia(freq, qtd_dezenas=qtd_dezenas, modo="mais")
-                        jogo_menos = montar_jogo_por_frequencia(freq, qtd_dezenas=qtd_dezenas, modo="menos")
-                        jogo_combinado = montar_jogo_combinado(freq, qtd_dezenas=qtd_dezenas)
-
-                        # Layout em 3 colunas para os 3 tipos de jogos
-                        col1, col2, col3 = st.columns(3)
-
-                        with col1:
-                            with st.container(border=True):
-                                st.subheader("Mais sorteados")
-                                render_chips(jogo_mais, variant="ok")
-
-                        with col2:
-                            with st.container(border=True):
-                                st.subheader("Menos sorteados")
-                                render_chips(jogo_menos, variant="bad")
-
-                        with col3:
-                            with st.container(border=True):
-                                st.subheader("Combinado")
-                                render_chips(jogo_combinado, variant="combinado")
+        if continuar_analise:
+            try:
+                executar_analise(busca_analise)
+            except Exception as e:
+                busca_analise["status"] = "cancelada"
+                st.error(f"Erro na análise: {e}")
 
+        if gerar_sugeridos:
+            if analise_ini > analise_fim:
+                st.error("A **Data inicial** não pode ser maior que a **Data final**.")
+            else:
+                try:
+                    executar_analise(nova_busca_analise("sugeridos", analise_ini, analise_fim, qtd_dezenas))
                 except Exception as e:
                     st.error(f"Erro na análise: {e}")
 
-    # --- JOGOS 16/9 ---
-    st.markdown("---")
-    st.subheader("🎯 Jogos 16/9")
+        resultado = st.session_state.get("analise_resultado_sugeridos")
+        if resultado:
+            if resultado["encontrados"] == 0:
+                st.warning("Não encontrei concursos dentro do período selecionado.")
+            else:
+                exibir_aviso_parcial(resultado)
 
-    if st.button("Gerar Jogos 16/9"):
-        if analise_ini > analise_fim:
-            st.error("A **Data inicial** não pode ser maior que a **Data final**.")
-        else:
-            with st.spinner("Calculando Jogos 16/9..."):
-                try:
-                    freq, concursos_encontrados = calcular_frequencia_no_periodo(analise_ini, analise_fim)
+                with st.container(border=True):
+                    st.subheader("Resumo da análise")
+                    st.markdown(
+                        f'<div class="small-muted"><b>Período:</b> {resultado["periodo_txt"]}</div>',
+                        unsafe_allow_html=True,
+                    )
 
-                    if concursos_encontrados == 0:
-                        st.warning("Não encontrei concursos dentro do período selecionado.")
-                    else:
-                        mais_sorteados, menos_sorteados = montar_jogos_16_9(freq)
+                    c1, c2 = st.columns(2)
+                    with c1:
+                        st.metric("Quantidade de Concursos", f"{resultado['encontrados']}")
+                    with c2:
+                        st.metric("Jogos", f"{resultado['qtd_dezenas']} dezenas")
+
+                    premios = resultado.get("premios")
+                    if premios:
+                        qtd = resultado["qtd_dezenas"]
+                        c3, c4 = st.columns(2)
+                        with c3:
+                            st.metric("Custo por jogo", formatar_moeda_br(math.comb(qtd, 15) * VALOR_APOSTA_SIMPLES))
+                        with c4:
+                            st.metric("Retorno esperado por jogo", formatar_moeda_br(retorno_esperado(premios["media"], qtd)))
+                        exibir_estatisticas_de_premios(premios, "analise")
+
+                    c5, c6 = st.columns([1, 2])
+                    with c5:
+                        formato_analise = st.radio(
+                            "Formato", options=list(FORMATOS_EXPORTACAO), horizontal=True, key="analise_formato"
+                        )
+                    with c6:
+                        ini_analise, fim_analise = resultado["periodo"]
+                        botao_exportacao(
+                            "Exportar frequência e atraso",
+                            f"frequencia-atraso-{ini_analise:%Y%m%d}-{fim_analise:%Y%m%d}",
+                            formato_analise,
+                            COLUNAS_FREQUENCIA_ATRASO,
+                            lambda: lotes_frequencia_atraso(obter_historico().base(), ini_analise, fim_analise),
+                            key="analise_exportar_frequencia",
+                        )
 
+                jogo_mais, jogo_menos, jogo_combinado = resultado["jogos"]
 
-                        col1, col2 = st.columns(2)
+                # Os 3 tipos de jogos lado a lado, num único elemento
+                render_cartoes(
+                    [
+                        cartao_jogo_html(titulo, chips_html(jogo, variant), notas=[nota_jogo_no_historico(jogo)])
+                        for titulo, jogo, variant in (
+                            ("Mais sorteados", jogo_mais, "ok"),
+                            ("Menos sorteados", jogo_menos, "bad"),
+                            ("Combinado", jogo_combinado, "combinado"),
+                        )
+                    ],
+                    colunas=3,
+                )
 
-                        with col1:
-                            with st.container(border=True):
-                                st.subheader("16 Mais Sorteados")
-                                st.caption(
-                                    f"Período: {analise_ini.strftime('%d/%m/%Y')} a {analise_fim.strftime('%d/%m/%Y')}")
-                                render_chips(mais_sorteados, variant="jogos-mais")
+        # --- JOGOS 16/9 ---
+        st.markdown("---")
+        st.subheader("🎯 Jogos 16/9")
 
-                        with col2:
-                            with st.container(border=True):
-                                st.subheader("9 Menos Sorteados")
-                                st.caption(
-                                    f"Período: {analise_ini.strftime('%d/%m/%Y')} a {analise_fim.strftime('%d/%m/%Y')}")
-                                render_chips(menos_sorteados, variant="jogos-menos")
+        if st.button("Gerar Jogos 16/9"):
+            if analise_ini > analise_fim:
+                st.error("A **Data inicial** não pode ser maior que a **Data final**.")
+            else:
+                try:
+                    executar_analise(nova_busca_analise("16_9", analise_ini, analise_fim, qtd_dezenas))
+                except Exception as e:
+                    st.error(f"Erro no Jogos 16/9: {e}")
 
+        resultado = st.session_state.get("analise_resultado_16_9")
+        if resultado:
+            if resultado["encontrados"] == 0:
+                st.warning("Não encontrei concursos dentro do período selecionado.")
+            else:
+                exibir_aviso_parcial(resultado)
+                mais_sorteados, menos_sorteados = resultado["jogos"]
+
+                periodo_nota = f"Período: {resultado['periodo_txt']}"
+                render_cartoes(
+                    [
+                        cartao_jogo_html(
+                            "16 Mais Sorteados",
+                            chips_html(mais_sorteados, "jogos-mais"),
+                            notas=[periodo_nota, nota_jogo_no_historico(mais_sorteados)],
+                        ),
+                        cartao_jogo_html(
+                            "9 Menos Sorteados",
+                            chips_html(menos_sorteados, "jogos-menos"),
+                            notas=[periodo_nota],
+                        ),
+                    ],
+                    colunas=2,
+                )
 
+        # --- JOGOS POR FILTROS ---
+        st.markdown("---")
+        st.subheader("🧮 Jogos por filtros")
+        st.caption(
+            "Entre todas as 3.268.760 apostas de 15 dezenas, mostra as que atendem aos filtros "
+            "com mais dezenas frequentes no período."
+        )
+
+        f1, f2 = st.columns(2)
+        with f1:
+            filtro_impares = st.slider("Ímpares", 0, 15, (7, 9), key="filtro_impares")
+            filtro_moldura = st.slider("Dezenas na moldura", 0, 15, (9, 11), key="filtro_moldura")
+            filtro_repetidas = st.slider("Repetidas do último concurso", 0, 15, (8, 10), key="filtro_repetidas")
+        with f2:
+            filtro_soma = st.slider("Soma das dezenas", 120, 270, (180, 210), key="filtro_soma")
+            filtro_primos = st.slider("Primos", 0, 9, (4, 6), key="filtro_primos")
+            filtro_qtd = st.number_input("Quantidade de jogos", min_value=1, max_value=50, value=5, key="filtro_qtd")
+        filtro_ineditos = st.checkbox("Só combinações que nunca saíram", value=True, key="filtro_ineditos")
+
+        if st.button("Gerar jogos filtrados"):
+            if analise_ini > analise_fim:
+                st.error("A **Data inicial** não pode ser maior que a **Data final**.")
+            else:
+                try:
+                    busca_filtros = nova_busca_analise("filtros", analise_ini, analise_fim, 15)
+                    busca_filtros["restricoes"] = Restricoes(
+                        impares=filtro_impares,
+                        soma=filtro_soma,
+                        moldura=filtro_moldura,
+                        primos=filtro_primos,
+                        repetidas=filtro_repetidas,
+                    )
+                    busca_filtros["qtd_jogos"] = int(filtro_qtd)
+                    busca_filtros["ineditos"] = filtro_ineditos
+                    executar_analise(busca_filtros)
                 except Exception as e:
-                    st.error(f"Erro no Jogos 16/9: {e}")
+                    st.error(f"Erro nos jogos por filtros: {e}")
+
+        resultado = st.session_state.get("analise_resultado_filtros")
+        if resultado:
+            if resultado["encontrados"] == 0:
+                st.warning("Não encontrei concursos dentro do período selecionado.")
+            elif not resultado["jogos"]:
+                st.warning("Nenhuma combinação atende a todos os filtros. Afrouxe algum deles.")
+            else:
+                exibir_aviso_parcial(resultado)
+                st.caption(f"Período: {resultado['periodo_txt']}")
+                render_cartoes([
+                    cartao_jogo_html(
+                        f"Jogo {idx} · pontuação {jogo['pontuacao']:.0f}",
+                        chips_html(jogo["dezenas"], "combinado"),
+                        notas=[
+                            f"Ímpares {jogo['impares']} · Soma {jogo['soma']} · Moldura {jogo['moldura']} · "
+                            f"Primos {jogo['primos']} · Repetidas {jogo['repetidas']} · Código {jogo['codigo']}",
+                            nota_jogo_no_historico(jogo["dezenas"]),
+                        ],
+                    )
+                    for idx, jogo in enumerate(resultado["jogos"], start=1)
+                ])
+
+# --- Administração (?admin=<LOTOFACIL_ADMIN_TOKEN>) ---
+if admin_autorizado():
+    with st.expander("🛠️ Administração", expanded=False):
+        historico_admin = obter_historico()
+        base_admin = historico_admin.base()
+        ultimo_gravado = int(base_admin["numero"].max()) if len(base_admin) else 0
+        st.caption(f"Histórico local: {len(base_admin)} concursos gravados (até o concurso {ultimo_gravado}).")
+
+        if historico_admin.snapshot:
+            snap = historico_admin.snapshot
+            st.caption(
+                f"Snapshot v{snap['versao']} de {snap['criado_em']} "
+                f"({snap['concursos']} concursos, até o {snap['ultimo_numero']})."
+            )
+        if historico_admin.erro_snapshot:
+            st.warning(f"Snapshot ignorado: {historico_admin.erro_snapshot}")
+        if historico_admin.erro_gravacao:
+            st.warning(
+                f"Histórico só em memória nesta réplica (não foi possível gravar em `{DIR_DADOS}`): "
+                f"{historico_admin.erro_gravacao}"
+            )
+
+        st.caption("Espelhos da Caixa, na ordem em que são tentados agora:")
+        ordem_espelhos = obter_saude_espelhos().ordem()
+        st.dataframe(
+            [
+                {
+                    "Espelho": e["espelho"],
+                    "Amostras": e["amostras"],
+                    "Latência média": f"{e['media_s']:.2f} s" if e["media_s"] is not None else "—",
+                    "p95 (hedge)": f"{e['p95_s']:.2f} s" if e["p95_s"] is not None else "—",
+                    "Falhas seguidas": e["falhas_seguidas"],
+                    "Quarentena": f"{e['quarentena_s']:.0f} s" if e["quarentena_s"] else "—",
+                }
+                for e in sorted(obter_saude_espelhos().estado(), key=lambda e: ordem_espelhos.index(e["espelho"]))
+            ],
+            hide_index=True,
+        )
+
+        fila_admin = obter_fila_reposicao()
+        itens_fila = fila_admin.estado()
+        st.caption(
+            f"Fila de reposição: {len(itens_fila)} concurso(s) aguardando, "
+            f"{fila_admin.repostos} reposto(s) desde o início."
+        )
+        if itens_fila:
+            st.dataframe(
+                [
+                    {
+                        "Concurso": item["concurso"],
+                        "Tentativas": item["tentativas"],
+                        "Próxima tentativa": (
+                            f"em {item['proxima_s']:.0f} s" if item["proxima_s"] is not None else "desistiu"
+                        ),
+                        "Último erro": item["erro"],
+                    }
+                    for item in itens_fila
+                ],
+                hide_index=True,
+            )
+
+        if st.button("Gerar snapshot"):
+            historico_admin.gravar()
+            buf = io.BytesIO()
+            exportar_snapshot(historico_admin.base(), buf)
+            st.session_state["admin_snapshot"] = buf.getvalue()
+
+        if st.session_state.get("admin_snapshot"):
+            st.download_button(
+                "Baixar snapshot",
+                data=st.session_state["admin_snapshot"],
+                file_name="lotofacil-snapshot.zip",
+                mime="application/zip",
+            )
+            st.caption(f"Para réplicas novas: salve em `{CAMINHO_SNAPSHOT}` (ou aponte `LOTOFACIL_SNAPSHOT`).")
+
+        st.checkbox(
+            "Perfilar as execuções desta sessão",
+            key="admin_perfil",
+            help="Cada execução do script passa a gerar um relatório (também com ?perfil=1 junto do ?admin= na URL).",
+        )
+
+# --- Fim da execução: fecha o perfil e mostra os relatórios ---
+concluir_perfil()
+if perfil_ligado():
+    exibir_perfis()
@@ -0,0 +1,165 @@
+"""
+Bytes enviados ao navegador por interação.
+
+A cada execução o Streamlit manda de novo todos os elementos da página pelo
+websocket (o navegador só reconcilia). Este benchmark percorre o fluxo
+principal com o AppTest, contra o stub da API do teste de carga, e soma o
+tamanho serializado de cada ForwardMsg que o script enfileira: é o que iria
+para o websocket (antes da compressão do websocket, se houver).
+
+Para cada interação mostra o total de bytes, de mensagens, o tempo da
+execução e os tipos de elemento que mais pesaram. Os últimos passos pesquisam
+o histórico inteiro, o pior caso de tamanho de página.
+
+O histórico já começa completo (snapshot gerado a partir do stub); com
+--frio, tudo vem do stub, passando pelo limitador de requisições.
+
+Uso:
+  python bench_bytes.py [--concursos 3500] [--frio] [--json]
+"""
+import argparse
+import collections
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+from bench_carga import APP, StubCaixa, _clicar
+
+_medida: Dict[str, Any] = {}
+
+
+def _instalar_medidor():
+    from streamlit.runtime.forward_msg_queue import ForwardMsgQueue
+
+    enfileirar = ForwardMsgQueue.enqueue
+
+    def enfileirar_medindo(self, msg):
+        tamanho = msg.ByteSize()
+        _medida["bytes"] += tamanho
+        _medida["mensagens"] += 1
+        tipo = msg.WhichOneof("type")
+        if tipo == "delta":
+            delta = msg.delta
+            tipo = delta.WhichOneof("type")
+            if tipo == "new_element":
+                tipo = delta.new_element.WhichOneof("type")
+        _medida["por_tipo"][tipo] += tamanho
+        return enfileirar(self, msg)
+
+    ForwardMsgQueue.enqueue = enfileirar_medindo
+
+
+def _gravar_snapshot_do_stub(stub: StubCaixa, destino: str):
+    import numpy as np
+
+    from snapshot import exportar_snapshot
+
+    # Mesmo layout de DTYPE_HISTORICO no app (faixa 1 = 15 acertos)
+    dtype = np.dtype([
+        ("numero", "<u4"),
+        ("data", "<u4"),
+        ("mascara", "<u4"),
+        ("premio", "<f8", (5,)),
+        ("ganhadores", "<u4", (5,)),
+    ])
+    registros = np.zeros(stub.concursos, dtype=dtype)
+    for i, reg in enumerate(registros):
+        concurso = stub.concurso(i + 1)
+        rateio = sorted(concurso["listaRateioPremio"], key=lambda r: r["faixa"])
+        reg["numero"] = concurso["numero"]
+        reg["data"] = datetime.strptime(concurso["dataApuracao"], "%d/%m/%Y").date().toordinal()
+        reg["mascara"] = sum(1 << (int(d) - 1) for d in concurso["listaDezenas"])
+        reg["premio"] = [r["valorPremio"] for r in rateio]
+        reg["ganhadores"] = [r["numeroDeGanhadores"] for r in rateio]
+    exportar_snapshot(registros, destino)
+
+
+def _medir(rotulo: str, acao: Callable[[], None]) -> Dict[str, Any]:
+    _medida.update(bytes=0, mensagens=0, por_tipo=collections.Counter())
+    inicio = time.perf_counter()
+    acao()
+    return {
+        "interacao": rotulo,
+        "bytes": _medida["bytes"],
+        "mensagens": _medida["mensagens"],
+        "segundos": time.perf_counter() - inicio,
+        "maiores": _medida["por_tipo"].most_common(3),
+    }
+
+
+def percorrer_fluxo() -> Tuple[List[Dict[str, Any]], List[str]]:
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP, default_timeout=300)
+
+    def abrir_secoes():
+        at.session_state["secao_historico"] = True
+        at.session_state["secao_sugestao"] = True
+        at.run()
+
+    def pesquisar_tudo():
+        at.checkbox(key="hist_tudo").check()
+        _clicar(at, "Pesquisar histórico")
+
+    def marcar_um_dia():
+        dias = at.session_state["hist_dias"]
+        at.multiselect(key="hist_extras_multiselect").set_value(dias[-1:]).run()
+
+    passos = [
+        ("tela de tema", at.run),
+        ("página principal", lambda: _clicar(at, "☀️ Claro")),
+        ("abrir seções", abrir_secoes),
+        ("conferir", lambda: _clicar(at, "Conferir")),
+        ("pesquisar histórico", lambda: _clicar(at, "Pesquisar histórico")),
+        ("gerar sugeridos", lambda: _clicar(at, "Gerar jogos sugeridos")),
+        ("gerar 16/9", lambda: _clicar(at, "Gerar Jogos 16/9")),
+        ("gerar filtrados", lambda: _clicar(at, "Gerar jogos filtrados")),
+        ("rerun com tudo na tela", at.run),
+        ("pesquisar todo o histórico", pesquisar_tudo),
+        ("marcar 1 dia de extras", marcar_um_dia),
+    ]
+    resultados = [_medir(rotulo, acao) for rotulo, acao in passos]
+    erros = [str(e.value) for e in at.exception] + [str(e.value) for e in at.error]
+    return resultados, erros
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concursos", type=int, default=3500, help="concursos existentes no stub")
+    parser.add_argument("--frio", action="store_true", help="histórico vazio: tudo vem do stub")
+    parser.add_argument("--json", action="store_true", help="imprime o resultado em JSON")
+    args = parser.parse_args()
+
+    stub = StubCaixa(args.concursos, 0.0)
+    dados = tempfile.TemporaryDirectory(prefix="lotofacil-bytes-")
+    os.environ["LOTOFACIL_BASE_URLS"] = ",".join(stub.base_urls)
+    os.environ["LOTOFACIL_SNAPSHOT"] = os.path.join(dados.name, "snapshot.zip")
+    os.environ["LOTOFACIL_DADOS"] = dados.name
+    if not args.frio:
+        _gravar_snapshot_do_stub(stub, os.environ["LOTOFACIL_SNAPSHOT"])
+
+    _instalar_medidor()
+    try:
+        resultados, erros = percorrer_fluxo()
+    finally:
+        stub.encerrar()
+        dados.cleanup()
+
+    if args.json:
+        print(json.dumps({"interacoes": resultados, "erros": erros}, indent=2))
+    else:
+        print(f"{'interação':<28}{'bytes':>10}{'msgs':>7}{'s':>7}   maiores tipos de elemento")
+        for r in resultados:
+            maiores = ", ".join(f"{tipo} {qtd / 1024:.1f} KB" for tipo, qtd in r["maiores"])
+            print(f"{r['interacao']:<28}{r['bytes']:>10}{r['mensagens']:>7}{r['segundos']:>7.1f}   {maiores}")
+        for e in erros:
+            print(f"erro no app: {e}")
+    sys.exit(1 if erros else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+"""
+Teste de carga: N sessões simultâneas do app contra um stub local da API da Caixa.
+
+Cada sessão é um AppTest (headless) numa thread, todas no mesmo processo, como
+num servidor Streamlit: dividem os caches (st.cache_resource), o histórico
+binário e o limitador de requisições. Cada sessão escolhe o tema e repete o
+fluxo Conferir -> Pesquisar histórico -> Gerar jogos sugeridos.
+
+Para cada nível de concorrência mostra:
+  - vazão (ações concluídas por segundo);
+  - latência p50/p95/p99 por ação, medida do clique ao fim da execução do script;
+  - memória por sessão (crescimento do RSS do processo / sessões);
+  - eficiência de cache: chamadas ao stub por ação e acerto de cache do Conferir.
+
+O stub serve os dois espelhos (BASE_URLS) via LOTOFACIL_BASE_URLS, com
+latência configurável; o histórico vai para um diretório temporário.
+
+Uso:
+  python bench_carga.py [--sessoes 1,5,10,20] [--rodadas 3] [--latencia-ms 80] [--frio] [--json]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+ACOES = ("conferir", "historico", "sugestao")
+BOTOES = {
+    "conferir": "Conferir",
+    "historico": "Pesquisar histórico",
+    "sugestao": "Gerar jogos sugeridos",
+}
+
+
+# --- Stub da API da Caixa ---
+class StubCaixa:
+    """
+    Servidor HTTP local que imita a API: /<espelho>/lotofacil (último) e
+    /<espelho>/lotofacil/<n>. Concursos sintéticos e determinísticos, um por
+    dia (menos domingo) até hoje.
+    """
+
+    def __init__(self, concursos: int, latencia_s: float):
+        self.concursos = concursos
+        self.latencia_s = latencia_s
+        self.requisicoes = 0
+        self.requisicoes_ultimo = 0  # /lotofacil sem número: o que o Conferir (último) pede
+        self._lock = threading.Lock()
+        self._datas = self._gerar_datas(concursos)
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub._responder(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._servidor.daemon_threads = True
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+
+    @staticmethod
+    def _gerar_datas(concursos: int) -> List[date]:
+        datas, dia = [], date.today()
+        while len(datas) < concursos:
+            if dia.weekday() != 6:
+                datas.append(dia)
+            dia -= timedelta(days=1)
+        return datas[::-1]
+
+    @property
+    def base_urls(self) -> List[str]:
+        porta = self._servidor.server_address[1]
+        return [f"http://127.0.0.1:{porta}/{espelho}/lotofacil" for espelho in ("servicebus", "webapi")]
+
+    def contar(self) -> Tuple[int, int]:
+        with self._lock:
+            return self.requisicoes, self.requisicoes_ultimo
+
+    def concurso(self, numero: int) -> Dict[str, Any]:
+        rnd = random.Random(numero)
+        return {
+            "numero": numero,
+            "dataApuracao": self._datas[numero - 1].strftime("%d/%m/%Y"),
+            "listaDezenas": [f"{d:02d}" for d in sorted(rnd.sample(range(1, 26), 15))],
+            "listaRateioPremio": [
+                {"faixa": 1, "numeroDeGanhadores": rnd.randint(0, 5), "valorPremio": 1_500_000.0},
+                {"faixa": 2, "numeroDeGanhadores": rnd.randint(100, 400), "valorPremio": 1_800.0},
+                {"faixa": 3, "numeroDeGanhadores": rnd.randint(5_000, 15_000), "valorPremio": 30.0},
+                {"faixa": 4, "numeroDeGanhadores": rnd.randint(100_000, 200_000), "valorPremio": 12.0},
+                {"faixa": 5, "numeroDeGanhadores": rnd.randint(1_000_000, 2_000_000), "valorPremio": 6.0},
+            ],
+        }
+
+    def _responder(self, handler: BaseHTTPRequestHandler):
+        final = handler.path.rstrip("/").rsplit("/", 1)[-1]
+        with self._lock:
+            self.requisicoes += 1
+            self.requisicoes_ultimo += final == "lotofacil"
+        time.sleep(self.latencia_s * random.uniform(0.5, 1.5))
+
+        numero = self.concursos if final == "lotofacil" else int(final) if final.isdigit() else 0
+        if not 1 <= numero <= self.concursos:
+            handler.send_response(404)
+            handler.end_headers()
+            return
+
+        corpo = json.dumps(self.concurso(numero)).encode()
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(corpo)))
+        handler.end_headers()
+        handler.wfile.write(corpo)
+
+    def encerrar(self):
+        self._servidor.shutdown()
+
+
+# --- Sessões ---
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for linha in f:
+                if linha.startswith("VmRSS:"):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _clicar(at, rotulo: str):
+    for botao in at.button:
+        if botao.label == rotulo:
+            botao.click().run()
+            return
+    raise RuntimeError(f"Botão não encontrado: {rotulo}")
+
+
+def _preparar_apptest_concorrente():
+    """
+    O AppTest foi feito para um teste por vez: cada execução instala um Runtime
+    falso no singleton e o zera no fim, derrubando as outras sessões. Aqui
+    todas dividem um único Runtime falso (como as sessões de um servidor), e o
+    AppTest passa a instalar/zerar o seu num substituto que ninguém lê.
+    """
+    from unittest.mock import MagicMock
+
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.dataframe_source_manager import DataframeSourceManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.testing.v1 import app_test
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.dataframe_source_mgr = DataframeSourceManager()
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = runtime
+
+    class RuntimeDoAppTest:
+        _instance = None
+
+    app_test.Runtime = RuntimeDoAppTest
+    # O AppTest liga/desliga esta opção a cada execução; ligada de vez, as sessões não se atropelam
+    config.set_option("global.appTest", True)
+
+
+def _abrir_sessao():
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP, default_timeout=300)
+    at.run()
+    _clicar(at, "☀️ Claro")
+    at.session_state["secao_historico"] = True
+    at.session_state["secao_sugestao"] = True
+    at.run()
+    return at
+
+
+def _rodar_sessao(rodadas: int, inicio: threading.Barrier, medidas: List[Dict[str, Any]], sessoes: list):
+    try:
+        at = _abrir_sessao()
+    except Exception as e:
+        medidas.append({"acao": "abrir", "ms": 0.0, "erro": str(e)})
+        inicio.abort()
+        return
+    sessoes.append(at)  # mantém viva para medir a memória por sessão
+
+    try:
+        inicio.wait()
+    except threading.BrokenBarrierError:
+        return
+
+    for _rodada in range(rodadas):
+        for acao in ACOES:
+            t0 = time.perf_counter()
+            erro: Optional[str] = None
+            try:
+                _clicar(at, BOTOES[acao])
+                falhas = [e.value for e in at.exception] + [e.value for e in at.error]
+                if falhas:
+                    erro = str(falhas[0])
+            except Exception as e:
+                erro = str(e)
+            medidas.append({"acao": acao, "ms": (time.perf_counter() - t0) * 1000, "erro": erro})
+
+
+def _percentil(valores: List[float], q: float) -> float:
+    if not valores:
+        return 0.0
+    if len(valores) == 1:
+        return valores[0]
+    return statistics.quantiles(valores, n=100, method="inclusive")[q - 1]
+
+
+def medir_nivel(n: int, rodadas: int, stub: StubCaixa) -> Dict[str, Any]:
+    medidas: List[Dict[str, Any]] = []
+    sessoes: list = []
+    rss_antes = _rss_mb()
+    chamadas_antes, _ultimo = stub.contar()
+
+    inicio = threading.Barrier(n + 1)
+    threads = [threading.Thread(target=_rodar_sessao, args=(rodadas, inicio, medidas, sessoes)) for _ in range(n)]
+    for t in threads:
+        t.start()
+    try:
+        inicio.wait()
+    except threading.BrokenBarrierError:
+        pass
+    # Sessões abertas e paradas na largada: a memória delas já está no RSS
+    rss_sessoes = _rss_mb()
+    chamadas_largada, ultimo_largada = stub.contar()
+
+    t0 = time.perf_counter()
+    for t in threads:
+        t.join()
+    duracao = time.perf_counter() - t0
+    chamadas, ultimo = stub.contar()
+    chamadas, ultimo = chamadas - chamadas_largada, ultimo - ultimo_largada
+
+    resultado: Dict[str, Any] = {
+        "sessoes": n,
+        "acoes": len([m for m in medidas if m["acao"] in ACOES]),
+        "erros": sorted({m["erro"] for m in medidas if m["erro"]}),
+        "vazao_acoes_s": round(len(medidas) / duracao, 2) if duracao else 0.0,
+        "memoria_por_sessao_mb": round(max(0.0, rss_sessoes - rss_antes) / n, 2),
+        "rss_mb": round(_rss_mb(), 1),
+        "chamadas_api": chamadas,
+        "chamadas_api_abertura": chamadas_largada - chamadas_antes,
+        "latencia_ms": {},
+    }
+    for acao in ACOES:
+        tempos = sorted(m["ms"] for m in medidas if m["acao"] == acao and not m["erro"])
+        resultado["latencia_ms"][acao] = {
+            "p50": round(_percentil(tempos, 50), 1),
+            "p95": round(_percentil(tempos, 95), 1),
+            "p99": round(_percentil(tempos, 99), 1),
+        }
+
+    # Cada Conferir pede o último concurso: sem cache, seria >= 1 chamada ao stub por clique
+    conferir = len([m for m in medidas if m["acao"] == "conferir"])
+    resultado["chamadas_por_acao"] = round(chamadas / max(1, resultado["acoes"]), 3)
+    resultado["acerto_cache_conferir"] = round(1 - min(ultimo, conferir) / conferir, 3) if conferir else None
+    return resultado
+
+
+def imprimir(resultados: List[Dict[str, Any]]):
+    print(
+        f"{'sessões':>7} {'ações/s':>8} "
+        + " ".join(f"{acao + ' p50/p95/p99 (ms)':>32}" for acao in ACOES)
+        + f" {'MB/sessão':>10} {'API/ação':>9} {'cache conf.':>11} {'erros':>6}"
+    )
+    for r in resultados:
+        lat = " ".join(
+            f"{r['latencia_ms'][a]['p50']:>10.0f}/{r['latencia_ms'][a]['p95']:>9.0f}/{r['latencia_ms'][a]['p99']:>9.0f}"
+            for a in ACOES
+        )
+        cache = f"{100 * r['acerto_cache_conferir']:.0f}%" if r["acerto_cache_conferir"] is not None else "—"
+        print(
+            f"{r['sessoes']:>7} {r['vazao_acoes_s']:>8.2f} {lat} "
+            f"{r['memoria_por_sessao_mb']:>10.2f} {r['chamadas_por_acao']:>9.3f} {cache:>11} {len(r['erros']):>6}"
+        )
+    for r in resultados:
+        for e in r["erros"]:
+            print(f"erro com {r['sessoes']} sessão(ões): {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessoes", default="1,5,10,20", help="níveis de concorrência, separados por vírgula")
+    parser.add_argument("--rodadas", type=int, default=3, help="vezes que cada sessão repete o fluxo")
+    parser.add_argument("--latencia-ms", type=float, default=80.0, help="latência média do stub")
+    parser.add_argument("--concursos", type=int, default=3500, help="concursos existentes no stub")
+    parser.add_argument("--frio", action="store_true", help="limpa caches e histórico antes de cada nível")
+    parser.add_argument("--json", action="store_true", help="imprime o resultado em JSON")
+    args = parser.parse_args()
+
+    stub = StubCaixa(args.concursos, args.latencia_ms / 1000)
+    dados = tempfile.TemporaryDirectory(prefix="lotofacil-carga-")
+    os.environ["LOTOFACIL_BASE_URLS"] = ",".join(stub.base_urls)
+    os.environ["LOTOFACIL_SNAPSHOT"] = os.path.join(dados.name, "sem-snapshot.zip")
+
+    import streamlit as st
+
+    _preparar_apptest_concorrente()
+    resultados = []
+    try:
+        # Aquecimento: imports e compilação do script não entram na memória por sessão
+        os.environ["LOTOFACIL_DADOS"] = os.path.join(dados.name, "aquecimento")
+        _abrir_sessao()
+
+        for nivel, n in enumerate(int(x) for x in args.sessoes.split(",")):
+            if args.frio or nivel == 0:
+                st.cache_resource.clear()
+                st.cache_data.clear()
+                os.environ["LOTOFACIL_DADOS"] = os.path.join(dados.name, f"nivel-{nivel}")
+            resultados.append(medir_nivel(n, args.rodadas, stub))
+            if not args.json:
+                print(f"... {n} sessão(ões): {resultados[-1]['vazao_acoes_s']} ações/s", file=sys.stderr)
+    finally:
+        stub.encerrar()
+        dados.cleanup()
+
+    if args.json:
+        print(json.dumps(resultados, indent=2))
+    else:
+        imprimir(resultados)
+    sys.exit(1 if any(r["erros"] for r in resultados) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark de inicialização do app.
+
+Cada repetição roda num processo novo (como uma réplica recém-criada) e mede,
+com o AppTest do Streamlit:
+  - tela de tema: primeira execução do script até a escolha Claro/Escuro;
+  - página principal (fria): primeira execução após escolher o tema;
+  - página principal (quente): execução seguinte da mesma sessão.
+
+Mede-se só a execução do script na thread do Streamlit (compilação, imports
+do app e envio dos elementos); o import e o aquecimento do próprio Streamlit
+ficam de fora, pois o servidor já os pagou. Sai com código 1 se a mediana
+estourar o orçamento.
+
+Uso:
+  python bench_startup.py [--repeticoes 5] [--json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+# Orçamento de tempo até a primeira pintura (ms)
+ORCAMENTO_MS = {
+    "tela_tema": 100.0,
+    "pagina_principal_fria": 500.0,
+    "pagina_principal_quente": 100.0,
+}
+
+_MEDICAO = r"""
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+# Mede só a execução do script (na thread do script), sem o polling do AppTest
+tempos = []
+_run_script = LocalScriptRunner._run_script
+
+
+def _run_script_cronometrado(self, rerun_data):
+    t0 = time.perf_counter()
+    try:
+        return _run_script(self, rerun_data)
+    finally:
+        tempos.append((time.perf_counter() - t0) * 1000)
+
+
+LocalScriptRunner._run_script = _run_script_cronometrado
+
+
+def cronometrar(at):
+    tempos.clear()
+    at.run()
+    return sum(tempos)
+
+
+# Aquecimento do runtime do Streamlit (custo do servidor, não do app)
+AppTest.from_string("import streamlit as st\nst.write('aquecimento')").run()
+
+at = AppTest.from_file(sys.argv[1], default_timeout=60)
+tela_tema = cronometrar(at)
+at.session_state["tema_selecionado"] = "Claro"
+pagina_fria = cronometrar(at)
+pagina_quente = cronometrar(at)
+
+erros = [e.value for e in at.exception] + [e.value for e in at.error]
+print(json.dumps({
+    "tela_tema": tela_tema,
+    "pagina_principal_fria": pagina_fria,
+    "pagina_principal_quente": pagina_quente,
+    "erros": [str(e) for e in erros],
+}))
+"""
+
+
+def medir_uma_vez() -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-c", _MEDICAO, APP],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(APP),
+        check=True,
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="imprime o resultado em JSON")
+    args = parser.parse_args()
+
+    amostras = [medir_uma_vez() for _ in range(args.repeticoes)]
+    erros = sorted({e for a in amostras for e in a["erros"]})
+
+    resultado = {}
+    for etapa, orcamento in ORCAMENTO_MS.items():
+        valores = [a[etapa] for a in amostras]
+        resultado[etapa] = {
+            "mediana_ms": round(statistics.median(valores), 1),
+            "max_ms": round(max(valores), 1),
+            "orcamento_ms": orcamento,
+        }
+
+    if args.json:
+        print(json.dumps({"etapas": resultado, "erros": erros}, indent=2))
+    else:
+        print(f"{'etapa':<26}{'mediana':>10}{'max':>10}{'orçamento':>12}")
+        for etapa, r in resultado.items():
+            marca = "" if r["mediana_ms"] <= r["orcamento_ms"] else "  << estourou"
+            print(f"{etapa:<26}{r['mediana_ms']:>8.1f}ms{r['max_ms']:>8.1f}ms{r['orcamento_ms']:>10.0f}ms{marca}")
+        for e in erros:
+            print(f"erro no app: {e}")
+
+    estourou = any(r["mediana_ms"] > r["orcamento_ms"] for r in resultado.values())
+    sys.exit(1 if estourou or erros else 0)
+
+
+if __name__ == "__main__":
+    main()
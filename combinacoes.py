@@ -0,0 +1,278 @@
+"""
+Índice de todas as apostas simples da Lotofácil: C(25, 15) = 3.268.760
+combinações, uma máscara de 25 bits cada (bit d - 1 = dezena d), com os
+atributos usados nos filtros já calculados em colunas compactas.
+
+Filtrar é aplicar predicados vetorizados nas colunas; a pontuação por
+frequência só é calculada para as combinações que passaram no filtro.
+
+Cada aposta simples também tem um código único em [0, C(25, 15)) pelo sistema
+combinatório ("combinadic"): dá para guardá-la como um inteiro e marcar as já
+sorteadas num bitset de ~400 KB.
+"""
+import itertools
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+TOTAL_COMBINACOES = 3_268_760
+
+DEZENAS_MOLDURA = (1, 2, 3, 4, 5, 6, 10, 11, 15, 16, 20, 21, 22, 23, 24, 25)
+DEZENAS_PRIMAS = (2, 3, 5, 7, 11, 13, 17, 19, 23)
+
+
+def mascara_de(dezenas) -> int:
+    mascara = 0
+    for d in dezenas:
+        mascara |= 1 << (d - 1)
+    return mascara
+
+
+MASCARA_IMPARES = mascara_de(range(1, 26, 2))
+MASCARA_MOLDURA = mascara_de(DEZENAS_MOLDURA)
+MASCARA_PRIMAS = mascara_de(DEZENAS_PRIMAS)
+
+
+def enumerar_mascaras() -> np.ndarray:
+    """
+    Todas as máscaras de 25 bits com 15 bits ligados. Junta as metades alta
+    (13 bits) e baixa (12 bits) agrupadas pela quantidade de bits ligados,
+    sem percorrer os 2^25 valores.
+    """
+    baixos = np.arange(1 << 12, dtype=np.uint32)
+    altos = np.arange(1 << 13, dtype=np.uint32)
+    bits_baixos = np.bitwise_count(baixos)
+    bits_altos = np.bitwise_count(altos)
+
+    partes = []
+    for k in range(0, 14):
+        a = altos[bits_altos == k]
+        b = baixos[bits_baixos == 15 - k]
+        if len(a) and len(b):
+            partes.append(((a[:, None] << 12) | b[None, :]).ravel())
+    return np.concatenate(partes)
+
+
+def somar_pesos(mascaras: np.ndarray, pesos) -> np.ndarray:
+    """
+    Soma, para cada máscara, o peso (pesos[d - 1]) das dezenas ligadas. Usa uma
+    tabela de 256 entradas por byte: 4 consultas por máscara em vez de 25 bits.
+    """
+    pesos32 = np.zeros(32)
+    pesos32[:25] = np.asarray(pesos, dtype=np.float64)
+    bits = (np.arange(256)[:, None] >> np.arange(8)) & 1
+    tabela = pesos32.reshape(4, 8) @ bits.T  # tabela[k, v]: byte k com valor v
+
+    octetos = np.asarray(mascaras, dtype="<u4").view(np.uint8).reshape(-1, 4)
+    return tabela[0][octetos[:, 0]] + tabela[1][octetos[:, 1]] + tabela[2][octetos[:, 2]] + tabela[3][octetos[:, 3]]
+
+
+# --- Código da combinação (sistema combinatório) ---
+# _BINOMIAIS[n, k] = C(n, k), para n em [0, 25) e k em [0, 15]
+_BINOMIAIS = np.array([[math.comb(n, k) for k in range(16)] for n in range(25)], dtype=np.int64)
+
+
+def codificar_combinacao(dezenas) -> int:
+    """
+    Código da aposta simples: soma de C(d_i - 1, i) com as dezenas em ordem
+    crescente (i = 1..15). É a posição da aposta na ordem colexicográfica.
+    """
+    dezenas = sorted(dezenas)
+    if len(dezenas) != 15 or len(set(dezenas)) != 15 or dezenas[0] < 1 or dezenas[-1] > 25:
+        raise RuntimeError(f"Aposta simples precisa de 15 dezenas distintas entre 1 e 25: {dezenas}")
+    return sum(math.comb(d - 1, i) for i, d in enumerate(dezenas, start=1))
+
+
+def decodificar_combinacao(codigo: int) -> List[int]:
+    """
+    Dezenas (em ordem crescente) da aposta com esse código.
+    """
+    if not 0 <= codigo < TOTAL_COMBINACOES:
+        raise RuntimeError(f"Código de combinação fora do intervalo: {codigo}")
+
+    dezenas = []
+    d = 25
+    for i in range(15, 0, -1):
+        # Maior d com C(d - 1, i) <= código restante
+        while math.comb(d - 1, i) > codigo:
+            d -= 1
+        dezenas.append(d)
+        codigo -= math.comb(d - 1, i)
+        d -= 1
+    return dezenas[::-1]
+
+
+def codificar_mascaras(mascaras) -> np.ndarray:
+    """
+    codificar_combinacao para um array de máscaras (15 bits ligados): uma
+    passada por bit, somando C(bit, bits ligados até ele).
+    """
+    mascaras = np.asarray(mascaras, dtype=np.uint32)
+    codigos = np.zeros(len(mascaras), dtype=np.int64)
+    ligados = np.zeros(len(mascaras), dtype=np.int64)
+    for bit in range(25):
+        ligado = ((mascaras >> np.uint32(bit)) & 1).astype(bool)
+        ligados += ligado
+        codigos += np.where(ligado, _BINOMIAIS[bit][np.minimum(ligados, 15)], 0)
+    return codigos
+
+
+class SorteiosOcorridos:
+    """
+    Um bit por aposta simples (posição = código), ligado se aquela combinação já
+    saiu em algum concurso. Guarda também as máscaras sorteadas, alinhadas aos
+    números dos concursos, para medir de quanto uma aposta passou perto.
+    """
+
+    def __init__(self, mascaras, numeros):
+        # Cópias: não seguram o mmap do histórico de onde as colunas vieram
+        self.mascaras = np.array(mascaras, dtype=np.uint32)
+        self.numeros = np.array(numeros)
+        self.bits = np.zeros((TOTAL_COMBINACOES + 7) // 8, dtype=np.uint8)
+        codigos = codificar_mascaras(self.mascaras)
+        np.bitwise_or.at(self.bits, codigos >> 3, np.left_shift(1, codigos & 7).astype(np.uint8))
+
+    def __len__(self) -> int:
+        return len(self.mascaras)
+
+    def contem(self, codigos) -> np.ndarray:
+        """
+        Para cada código, se a combinação já foi sorteada (uma consulta ao bitset).
+        """
+        codigos = np.asarray(codigos, dtype=np.int64)
+        return ((self.bits[codigos >> 3] >> (codigos & 7)) & 1).astype(bool)
+
+    def ja_sorteada(self, dezenas) -> bool:
+        """
+        Se as 15 dezenas de alguma aposta simples contida no jogo já saíram juntas:
+        uma consulta ao bitset por aposta simples (16 para um jogo de 16 dezenas).
+        """
+        codigos = [codificar_combinacao(c) for c in itertools.combinations(dezenas, 15)]
+        return bool(self.contem(codigos).any())
+
+    def sorteada_em(self, dezenas) -> Optional[int]:
+        """
+        Concurso (o mais recente) em que uma aposta simples contida no jogo saiu
+        inteira, ou None. Os concursos só são percorridos se o bitset disser que saiu.
+        """
+        if not self.ja_sorteada(dezenas):
+            return None
+        contidas = (self.mascaras & ~np.uint32(mascara_de(dezenas))) == 0
+        return int(self.numeros[np.flatnonzero(contidas)[-1]])
+
+    def mais_perto(self, dezenas) -> Tuple[int, Optional[int]]:
+        """
+        Maior número de acertos do jogo num concurso e o concurso (o mais
+        recente, se houver empate).
+        """
+        if len(self.mascaras) == 0:
+            return 0, None
+        acertos = np.bitwise_count(self.mascaras & np.uint32(mascara_de(dezenas)))
+        maximo = int(acertos.max())
+        return maximo, int(self.numeros[np.flatnonzero(acertos == maximo)[-1]])
+
+
+class IndiceCombinacoes:
+    """
+    Colunas alinhadas: mascaras[i] e os atributos da combinação i.
+    """
+
+    def __init__(self):
+        self.mascaras = enumerar_mascaras()
+        self.impares = np.bitwise_count(self.mascaras & MASCARA_IMPARES).astype(np.uint8)
+        self.moldura = np.bitwise_count(self.mascaras & MASCARA_MOLDURA).astype(np.uint8)
+        self.primos = np.bitwise_count(self.mascaras & MASCARA_PRIMAS).astype(np.uint8)
+        self.soma = somar_pesos(self.mascaras, range(1, 26)).astype(np.uint16)
+
+    def __len__(self) -> int:
+        return len(self.mascaras)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.mascaras, self.impares, self.moldura, self.primos, self.soma))
+
+
+@dataclass(frozen=True)
+class Restricoes:
+    """
+    Faixas (mínimo, máximo), inclusivas, de cada atributo da aposta.
+    repetidas conta as dezenas em comum com o último concurso.
+    """
+
+    impares: Tuple[int, int] = (0, 15)
+    soma: Tuple[int, int] = (120, 270)
+    moldura: Tuple[int, int] = (0, 15)
+    primos: Tuple[int, int] = (0, 9)
+    repetidas: Tuple[int, int] = (0, 15)
+
+    def filtrar(self, indice: IndiceCombinacoes, mascara_ultimo: int) -> np.ndarray:
+        """
+        Posições (no índice) das combinações que atendem a todas as faixas.
+        """
+        ok = (indice.impares >= self.impares[0]) & (indice.impares <= self.impares[1])
+        ok &= (indice.soma >= self.soma[0]) & (indice.soma <= self.soma[1])
+        ok &= (indice.moldura >= self.moldura[0]) & (indice.moldura <= self.moldura[1])
+        ok &= (indice.primos >= self.primos[0]) & (indice.primos <= self.primos[1])
+        posicoes = np.flatnonzero(ok)
+
+        if self.repetidas != (0, 15):
+            repetidas = np.bitwise_count(indice.mascaras[posicoes] & np.uint32(mascara_ultimo))
+            posicoes = posicoes[(repetidas >= self.repetidas[0]) & (repetidas <= self.repetidas[1])]
+        return posicoes
+
+
+def melhores_jogos(
+        indice: IndiceCombinacoes,
+        freq: Dict[int, int],
+        restricoes: Restricoes,
+        mascara_ultimo: int = 0,
+        quantidade: int = 10,
+        sorteadas: Optional[SorteiosOcorridos] = None,
+) -> List[Dict[str, Any]]:
+    """
+    As `quantidade` apostas com maior pontuação (soma da frequência das suas
+    dezenas no período) entre as que passam nas restrições. Empates saem na
+    ordem da máscara, então o resultado é sempre o mesmo. Com `sorteadas`,
+    as combinações que já saíram ficam de fora.
+    """
+    posicoes = restricoes.filtrar(indice, mascara_ultimo)
+    if len(posicoes) == 0:
+        return []
+
+    pontos = somar_pesos(indice.mascaras[posicoes], [freq.get(d, 0) for d in range(1, 26)])
+    # No máximo len(sorteadas) das melhores saem no bitset: basta separar essa folga
+    # (as `reserva` primeiras na ordem final: pontuação, depois máscara)
+    reserva = quantidade + (len(sorteadas) if sorteadas is not None else 0)
+    if len(posicoes) > reserva:
+        corte = np.partition(pontos, len(pontos) - reserva)[len(pontos) - reserva]
+        acima = np.flatnonzero(pontos > corte)
+        empatadas = np.flatnonzero(pontos == corte)
+        falta = reserva - len(acima)
+        if len(empatadas) > falta:
+            # Das empatadas com o corte ficam as de menor máscara, o mesmo desempate do final
+            empatadas = empatadas[np.argpartition(indice.mascaras[posicoes[empatadas]], falta - 1)[:falta]]
+        topo = np.concatenate([acima, empatadas])
+        posicoes, pontos = posicoes[topo], pontos[topo]
+    if sorteadas is not None:
+        ineditas = ~sorteadas.contem(codificar_mascaras(indice.mascaras[posicoes]))
+        posicoes, pontos = posicoes[ineditas], pontos[ineditas]
+    ordem = np.lexsort((indice.mascaras[posicoes], -pontos))[:quantidade]
+
+    jogos = []
+    for i in ordem:
+        p = int(posicoes[i])
+        mascara = int(indice.mascaras[p])
+        dezenas = [d for d in range(1, 26) if mascara >> (d - 1) & 1]
+        jogos.append({
+            "dezenas": dezenas,
+            "codigo": codificar_combinacao(dezenas),
+            "pontuacao": float(pontos[i]),
+            "impares": int(indice.impares[p]),
+            "soma": int(indice.soma[p]),
+            "moldura": int(indice.moldura[p]),
+            "primos": int(indice.primos[p]),
+            "repetidas": (mascara & mascara_ultimo).bit_count(),
+        })
+    return jogos
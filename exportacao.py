@@ -0,0 +1,115 @@
+"""
+Exportação em fluxo para CSV e Parquet.
+
+Uma tabela é descrita por colunas (nome, tipo) e um iterador de lotes, cada
+lote um dict coluna -> array/lista do mesmo tamanho. Os escritores consomem
+um lote por vez e gravam num arquivo temporário em disco, então a memória
+usada na geração não cresce com o tamanho da exportação.
+
+Tipos: "int", "float", "bool", "texto" e "data" (dia em date.toordinal()).
+"""
+import csv
+import io
+import os
+import tempfile
+from datetime import date
+from typing import Any, BinaryIO, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+Coluna = Tuple[str, str]
+Lote = Dict[str, Any]
+
+_ORDINAL_EPOCH = date(1970, 1, 1).toordinal()
+
+# rótulo -> (extensão, mime)
+FORMATOS_EXPORTACAO: Dict[str, Tuple[str, str]] = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+
+def _valores_csv(tipo: str, valores: Any) -> List[Any]:
+    if tipo == "data":
+        # Poucas datas distintas por lote (uma por concurso): formata cada uma uma vez
+        unicas, posicoes = np.unique(np.asarray(valores), return_inverse=True)
+        textos = [date.fromordinal(int(v)).isoformat() for v in unicas]
+        return [textos[k] for k in posicoes.ravel()]
+    if tipo == "bool":
+        return [int(bool(v)) for v in valores]
+    return np.asarray(valores).tolist()
+
+
+def escrever_csv(colunas: List[Coluna], lotes: Iterable[Lote], destino: BinaryIO) -> int:
+    texto = io.TextIOWrapper(destino, encoding="utf-8", newline="")
+    escritor = csv.writer(texto)
+    escritor.writerow([nome for nome, _tipo in colunas])
+
+    linhas = 0
+    for lote in lotes:
+        valores = [_valores_csv(tipo, lote[nome]) for nome, tipo in colunas]
+        escritor.writerows(zip(*valores))
+        linhas += len(valores[0]) if valores else 0
+
+    texto.flush()
+    texto.detach()  # devolve o arquivo binário aberto para quem chamou
+    return linhas
+
+
+def escrever_parquet(colunas: List[Coluna], lotes: Iterable[Lote], destino: BinaryIO) -> int:
+    # pyarrow só é importado quando alguém exporta em Parquet
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    tipos = {"int": pa.int64(), "float": pa.float64(), "bool": pa.bool_(), "texto": pa.string(), "data": pa.date32()}
+    esquema = pa.schema([(nome, tipos[tipo]) for nome, tipo in colunas])
+
+    linhas = 0
+    with pq.ParquetWriter(destino, esquema, compression="zstd") as escritor:
+        for lote in lotes:
+            arrays = []
+            for nome, tipo in colunas:
+                valores = lote[nome]
+                if tipo == "data":
+                    valores = (np.asarray(valores, dtype=np.int64) - _ORDINAL_EPOCH).astype(np.int32)
+                arrays.append(pa.array(valores, type=tipos[tipo]))
+            escritor.write_batch(pa.record_batch(arrays, schema=esquema))
+            linhas += len(arrays[0]) if arrays else 0
+    return linhas
+
+
+def exportar_para_arquivo(formato: str, colunas: List[Coluna], lotes: Iterable[Lote]) -> str:
+    """
+    Grava a tabela num arquivo temporário já fechado e devolve o caminho;
+    quem chama apaga o arquivo.
+    """
+    if formato not in FORMATOS_EXPORTACAO:
+        raise RuntimeError(f"Formato de exportação desconhecido: {formato}")
+
+    descritor, caminho = tempfile.mkstemp(suffix=f".{FORMATOS_EXPORTACAO[formato][0]}")
+    try:
+        with open(descritor, "wb") as destino:
+            if formato == "CSV":
+                escrever_csv(colunas, lotes, destino)
+            else:
+                escrever_parquet(colunas, lotes, destino)
+    except BaseException:
+        os.remove(caminho)
+        raise
+    return caminho
+
+
+def exportar_para_bytes(formato: str, colunas: List[Coluna], lotes: Iterable[Lote]) -> bytes:
+    """
+    O conteúdo do arquivo exportado, para o st.download_button. A geração
+    continua lote a lote em disco; só o arquivo pronto vai para a memória,
+    onde o Streamlit o guarda de qualquer forma para servir o download.
+    O temporário é fechado antes de ser lido e apagado logo depois (no
+    Windows um arquivo aberto não pode ser removido).
+    """
+    caminho = exportar_para_arquivo(formato, colunas, lotes)
+    try:
+        with open(caminho, "rb") as arquivo:
+            return arquivo.read()
+    finally:
+        os.remove(caminho)
@@ -0,0 +1,209 @@
+"""
+Perfil de uma execução do script, ligado sob demanda.
+
+Dois perfis rodam juntos:
+  - determinístico (cProfile) na thread que chamou iniciar() e nas tarefas
+    passadas por executar() em outras threads: chamadas e tempos exatos por
+    função, somados num só .prof (pstats, snakeviz);
+  - por amostragem, nas threads escolhidas pelo filtro (inclusive as dos pools
+    de consulta, que o cProfile não vê): a pilha de cada uma a cada intervalo,
+    exportada em "collapsed stacks" (flamegraph.pl, speedscope, inferno).
+"""
+import cProfile
+import collections
+import marshal
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+_ARQUIVO_POOL = os.path.join("concurrent", "futures", "thread.py")
+
+
+def _rotulo(code: Any) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _nome_thread(thread: threading.Thread) -> str:
+    # "ThreadPoolExecutor-3_0" e "ThreadPoolExecutor-7_2" viram a mesma raiz no flamegraph
+    return re.sub(r"-\d+(_\d+)?$", "", thread.name)
+
+
+def _ocioso(pilha: Tuple[Any, ...]) -> bool:
+    """
+    Thread de pool esperando trabalho: o frame mais interno do pool é o laço
+    _worker (rodando uma tarefa, seria o run() do item).
+    """
+    for code in reversed(pilha):
+        if code.co_filename.endswith(_ARQUIVO_POOL):
+            return code.co_name == "_worker"
+    return False
+
+
+class PerfilExecucao:
+    """
+    iniciar() e parar() devem ser chamados na mesma thread (a do script).
+    Depois de parar(), os relatórios podem ser gerados quantas vezes quiser.
+    Se a thread que chamou iniciar() termina sem chamar parar() (sessão
+    encerrada no meio do script), a amostragem para sozinha e parar() ainda
+    pode ser chamado depois, de qualquer thread.
+    """
+
+    def __init__(
+            self,
+            intervalo_s: float = 0.005,
+            filtro_thread: Optional[Callable[[threading.Thread], bool]] = None,
+    ):
+        self.intervalo_s = intervalo_s
+        self._filtro = filtro_thread or (lambda _thread: True)
+        self._cprofile: Optional[cProfile.Profile] = cProfile.Profile()
+        self._amostras: Dict[Tuple[str, Tuple[Any, ...]], int] = collections.Counter()
+        self._rodadas = 0
+        self._parar = threading.Event()
+        self._amostrador: Optional[threading.Thread] = None
+        self._inicio = 0.0
+        self._fim: Optional[float] = None
+        self._dono: Optional[threading.Thread] = None
+        self.duracao_s = 0.0
+        self._stats: Optional[Dict[Any, Any]] = None
+        self._lock = threading.Lock()
+        self._por_thread: Dict[int, cProfile.Profile] = {}
+
+    def iniciar(self):
+        self._inicio = time.perf_counter()
+        self._dono = threading.current_thread()
+        self._amostrador = threading.Thread(target=self._amostrar, name="perfil-amostrador", daemon=True)
+        self._amostrador.start()
+        try:
+            self._cprofile.enable()
+        except ValueError:
+            # Outro profiler já ativo no processo: fica só a amostragem
+            self._cprofile = None
+
+    def parar(self):
+        if self._amostrador is None:
+            return
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        agora = time.perf_counter()
+        self._parar.set()
+        self._amostrador.join()
+        self.duracao_s = (self._fim or agora) - self._inicio
+        self._amostrador = None
+
+        with self._lock:
+            perfis = [p for p in [self._cprofile, *self._por_thread.values()] if p is not None]
+            self._por_thread = {}
+        if perfis:
+            self._stats = pstats.Stats(*perfis).stats
+        self._cprofile = None
+
+    def executar(self, funcao: Callable[..., Any], *args: Any) -> Any:
+        """
+        Roda funcao(*args) com o cProfile desta thread (um por thread, reaproveitado
+        entre tarefas), para medir o que os pools fazem fora da thread do script.
+        """
+        ident = threading.get_ident()
+        with self._lock:
+            if self._amostrador is None:
+                return funcao(*args)
+            perfil = self._por_thread.setdefault(ident, cProfile.Profile())
+        try:
+            perfil.enable()
+        except ValueError:
+            return funcao(*args)
+        try:
+            return funcao(*args)
+        finally:
+            perfil.disable()
+
+    def _amostrar(self):
+        proprio = threading.get_ident()
+        while not self._parar.wait(self.intervalo_s):
+            if not self._dono.is_alive():
+                self._fim = time.perf_counter()
+                return
+            threads = [t for t in threading.enumerate() if t.ident != proprio and self._filtro(t)]
+            frames = sys._current_frames()
+            self._rodadas += 1
+            for thread in threads:
+                frame = frames.get(thread.ident)
+                pilha = []
+                while frame is not None:
+                    pilha.append(frame.f_code)
+                    frame = frame.f_back
+                pilha = tuple(reversed(pilha))
+                if pilha and not _ocioso(pilha):
+                    self._amostras[(_nome_thread(thread), pilha)] += 1
+
+    @property
+    def segundos_por_amostra(self) -> float:
+        return self.duracao_s / self._rodadas if self._rodadas else 0.0
+
+    def dados_prof(self) -> bytes:
+        """
+        Estatísticas do cProfile no formato de pstats.Stats.dump_stats (vazio
+        se o perfil determinístico não pôde ser ligado).
+        """
+        return marshal.dumps(self._stats) if self._stats else b""
+
+    def pilhas_colapsadas(self) -> str:
+        """
+        Uma linha por pilha distinta: "thread;externa;...;interna amostras".
+        """
+        linhas = [
+            ";".join([thread] + [_rotulo(code) for code in pilha]) + f" {qtd}"
+            for (thread, pilha), qtd in self._amostras.items()
+        ]
+        return "\n".join(sorted(linhas)) + "\n"
+
+    def _amostrado_por_funcao(self) -> Dict[str, float]:
+        # Tempo inclusivo: cada amostra conta uma vez para cada função na pilha
+        tempos: Dict[str, float] = collections.Counter()
+        for (_thread, pilha), qtd in self._amostras.items():
+            for nome in {code.co_name for code in pilha}:
+                tempos[nome] += qtd * self.segundos_por_amostra
+        return tempos
+
+    def resumo(self, funcoes: Iterable[str]) -> List[Dict[str, Any]]:
+        """
+        Para cada nome de função: chamadas e tempos (próprio e total) do cProfile
+        e o tempo amostrado somado em todas as threads.
+        """
+        medidas: Dict[str, List[float]] = {}
+        for (_arquivo, _linha, nome), (_cc, chamadas, proprio, total, _chamadores) in (self._stats or {}).items():
+            acumulado = medidas.setdefault(nome, [0, 0.0, 0.0])
+            acumulado[0] += chamadas
+            acumulado[1] += proprio
+            acumulado[2] += total
+
+        amostrado = self._amostrado_por_funcao()
+        linhas = []
+        for nome in funcoes:
+            chamadas, proprio, total = medidas.get(nome, (0, 0.0, 0.0))
+            linhas.append({
+                "funcao": nome,
+                "chamadas": int(chamadas),
+                "proprio_s": proprio,
+                "total_s": total,
+                "amostrado_s": amostrado.get(nome, 0.0),
+            })
+        return linhas
+
+    def mais_demoradas(self, limite: int = 15) -> List[Dict[str, Any]]:
+        """
+        As funções com maior tempo total no cProfile.
+        """
+        ordem = sorted((self._stats or {}).items(), key=lambda item: item[1][3], reverse=True)[:limite]
+        return [
+            {
+                "funcao": pstats.func_std_string(chave),
+                "chamadas": chamadas,
+                "proprio_s": proprio,
+                "total_s": total,
+            }
+            for chave, (_cc, chamadas, proprio, total, _chamadores) in ordem
+        ]
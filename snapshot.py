@@ -0,0 +1,139 @@
+"""
+Snapshot do histórico para o "cold start" de réplicas novas.
+
+O pacote é um .zip com:
+  manifesto.json            versão, data de criação, último concurso e sha256 de cada arquivo
+  historico.npy             registros do histórico binário (mesmo dtype usado pelo app)
+  frequencia_acumulada.npy  contagem acumulada de cada dezena (linha i = concursos [0, i))
+
+Uso (por exemplo no build da imagem):
+  python snapshot.py exportar .dados/historico_v2.npy snapshot/lotofacil-snapshot.zip
+  python snapshot.py verificar snapshot/lotofacil-snapshot.zip
+"""
+import argparse
+import hashlib
+import io
+import json
+import zipfile
+from datetime import datetime, timezone
+from typing import Any, BinaryIO, Dict, NamedTuple, Union
+
+import numpy as np
+
+FORMATO_SNAPSHOT = "lotofacil-snapshot"
+VERSAO_SNAPSHOT = 2
+ARQUIVOS_SNAPSHOT = ("historico.npy", "frequencia_acumulada.npy")
+CAMPOS_MANIFESTO = ("concursos", "ultimo_numero", "sha256")
+
+
+class SnapshotInvalido(RuntimeError):
+    pass
+
+
+class Snapshot(NamedTuple):
+    manifesto: Dict[str, Any]
+    historico: np.ndarray
+    frequencia_acumulada: np.ndarray
+
+
+def frequencia_acumulada(historico: np.ndarray) -> np.ndarray:
+    """
+    Linha i = quantas vezes cada dezena (coluna d - 1) saiu nos concursos [0, i)
+    do histórico. A frequência de um trecho contíguo é a diferença de duas linhas.
+    """
+    mascaras = np.asarray(historico["mascara"], dtype=np.uint32)
+    bits = (mascaras[:, None] >> np.arange(25, dtype=np.uint32)) & 1
+    acumulada = np.zeros((len(mascaras) + 1, 25), dtype=np.uint32)
+    np.cumsum(bits, axis=0, out=acumulada[1:])
+    return acumulada
+
+
+def _npy_bytes(arr: np.ndarray) -> bytes:
+    buf = io.BytesIO()
+    np.save(buf, np.asarray(arr))
+    return buf.getvalue()
+
+
+def exportar_snapshot(historico: np.ndarray, destino: Union[str, BinaryIO]):
+    historico = np.asarray(historico)
+    arquivos = {
+        "historico.npy": _npy_bytes(historico),
+        "frequencia_acumulada.npy": _npy_bytes(frequencia_acumulada(historico)),
+    }
+    manifesto = {
+        "formato": FORMATO_SNAPSHOT,
+        "versao": VERSAO_SNAPSHOT,
+        "criado_em": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "concursos": int(len(historico)),
+        "ultimo_numero": int(historico["numero"].max()) if len(historico) else 0,
+        "sha256": {nome: hashlib.sha256(dados).hexdigest() for nome, dados in arquivos.items()},
+    }
+
+    with zipfile.ZipFile(destino, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("manifesto.json", json.dumps(manifesto, indent=2))
+        for nome, dados in arquivos.items():
+            zf.writestr(nome, dados)
+
+
+def carregar_snapshot(origem: Union[str, BinaryIO]) -> Snapshot:
+    try:
+        with zipfile.ZipFile(origem) as zf:
+            manifesto = json.loads(zf.read("manifesto.json"))
+            if not isinstance(manifesto, dict):
+                raise SnapshotInvalido("Manifesto do snapshot não é um objeto JSON.")
+            if manifesto.get("formato") != FORMATO_SNAPSHOT or manifesto.get("versao") != VERSAO_SNAPSHOT:
+                raise SnapshotInvalido(
+                    f"Versão de snapshot não suportada: {manifesto.get('formato')} v{manifesto.get('versao')}."
+                )
+
+            checksums = manifesto.get("sha256")
+            ausentes = [c for c in CAMPOS_MANIFESTO if c not in manifesto]
+            ausentes += [n for n in ARQUIVOS_SNAPSHOT if not isinstance(checksums, dict) or n not in checksums]
+            if ausentes:
+                raise SnapshotInvalido(f"Snapshot incompleto, falta: {', '.join(ausentes)}.")
+
+            arrays = {}
+            for nome in ARQUIVOS_SNAPSHOT:
+                dados = zf.read(nome)
+                if hashlib.sha256(dados).hexdigest() != checksums[nome]:
+                    raise SnapshotInvalido(f"Checksum inválido em {nome}.")
+                arrays[nome] = np.load(io.BytesIO(dados), allow_pickle=False)
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile) as e:
+        raise SnapshotInvalido(f"Não consegui ler o snapshot: {e}")
+
+    historico = arrays["historico.npy"]
+    acumulada = arrays["frequencia_acumulada.npy"]
+    if (
+            historico.dtype.names is None
+            or not {"numero", "mascara"} <= set(historico.dtype.names)
+            or not isinstance(manifesto["ultimo_numero"], int)
+            or len(historico) != manifesto["concursos"]
+            or acumulada.shape != (len(historico) + 1, 25)
+    ):
+        raise SnapshotInvalido("Snapshot inconsistente com o manifesto.")
+
+    return Snapshot(manifesto, historico, acumulada)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta/verifica o snapshot do histórico da Lotofácil.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    exp = sub.add_parser("exportar", help="Gera o snapshot a partir do histórico binário (.npy).")
+    exp.add_argument("historico")
+    exp.add_argument("destino")
+
+    ver = sub.add_parser("verificar", help="Valida versão e checksums de um snapshot.")
+    ver.add_argument("snapshot")
+
+    args = parser.parse_args()
+    if args.comando == "exportar":
+        exportar_snapshot(np.load(args.historico), args.destino)
+        print(f"Snapshot gravado em {args.destino}")
+    else:
+        snap = carregar_snapshot(args.snapshot)
+        print(json.dumps(snap.manifesto, indent=2))
+
+
+if __name__ == "__main__":
+    main()
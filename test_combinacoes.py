@@ -0,0 +1,91 @@
+"""
+Testes de combinacoes.py (pytest). O índice completo leva alguns segundos
+para montar e é compartilhado pelos testes do módulo.
+"""
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+from combinacoes import (
+    TOTAL_COMBINACOES,
+    IndiceCombinacoes,
+    Restricoes,
+    SorteiosOcorridos,
+    codificar_combinacao,
+    codificar_mascaras,
+    decodificar_combinacao,
+    mascara_de,
+    melhores_jogos,
+    somar_pesos,
+)
+
+RESTRICOES = [Restricoes(), Restricoes(impares=(7, 9), soma=(180, 210))]
+
+
+@pytest.fixture(scope="module")
+def indice() -> IndiceCombinacoes:
+    return IndiceCombinacoes()
+
+
+def _por_forca_bruta(indice, freq, restricoes, quantidade, sorteadas=frozenset()):
+    """
+    Máscaras esperadas: tudo o que passa no filtro, em ordem de pontuação
+    (decrescente) e depois de máscara, sem as já sorteadas e sem corte parcial.
+    """
+    mascaras = indice.mascaras[restricoes.filtrar(indice, 0)]
+    pontos = somar_pesos(mascaras, [freq.get(d, 0) for d in range(1, 26)])
+    ordenadas = (int(m) for m in mascaras[np.lexsort((mascaras, -pontos))])
+    return list(itertools.islice((m for m in ordenadas if m not in sorteadas), quantidade))
+
+
+def _frequencias_com_empates():
+    # Poucos valores distintos: milhares de combinações empatam em cada pontuação
+    for semente in range(4):
+        rnd = random.Random(semente)
+        yield {d: rnd.randint(0, 3) for d in range(1, 26)}
+    yield {}  # tudo empatado em zero
+
+
+@pytest.mark.parametrize("restricoes", RESTRICOES)
+def test_melhores_jogos_igual_a_ordenar_tudo(indice, restricoes):
+    for freq in _frequencias_com_empates():
+        jogos = melhores_jogos(indice, freq, restricoes, quantidade=10)
+        assert [mascara_de(j["dezenas"]) for j in jogos] == _por_forca_bruta(indice, freq, restricoes, 10)
+
+
+@pytest.mark.parametrize("restricoes", RESTRICOES)
+def test_melhores_jogos_sem_as_ja_sorteadas(indice, restricoes):
+    rnd = random.Random(42)
+    for freq in _frequencias_com_empates():
+        # Sorteadas: metade das melhores (que precisam ser puladas) e outras ao acaso
+        melhores = _por_forca_bruta(indice, freq, restricoes, 10)
+        mascaras = melhores[::2] + [mascara_de(rnd.sample(range(1, 26), 15)) for _ in range(40)]
+        sorteadas = SorteiosOcorridos(mascaras, range(1, len(mascaras) + 1))
+
+        jogos = melhores_jogos(indice, freq, restricoes, quantidade=10, sorteadas=sorteadas)
+        esperadas = _por_forca_bruta(indice, freq, restricoes, 10, frozenset(mascaras))
+        assert [mascara_de(j["dezenas"]) for j in jogos] == esperadas
+
+
+def test_codigos_ida_e_volta():
+    rnd = random.Random(7)
+    apostas = [sorted(rnd.sample(range(1, 26), 15)) for _ in range(2000)]
+    apostas += [list(range(1, 16)), list(range(11, 26))]  # primeira e última na ordem colexicográfica
+
+    codigos = [codificar_combinacao(dezenas) for dezenas in apostas]
+    assert codigos[-2:] == [0, TOTAL_COMBINACOES - 1]
+    assert all(0 <= c < TOTAL_COMBINACOES for c in codigos)
+    assert [decodificar_combinacao(c) for c in codigos] == apostas
+    assert codificar_mascaras([mascara_de(dezenas) for dezenas in apostas]).tolist() == codigos
+
+
+def test_codigos_nas_pontas():
+    assert decodificar_combinacao(0) == list(range(1, 16))
+    assert decodificar_combinacao(TOTAL_COMBINACOES - 1) == list(range(11, 26))
+    for codigo in (0, 1, TOTAL_COMBINACOES - 2, TOTAL_COMBINACOES - 1):
+        assert codificar_combinacao(decodificar_combinacao(codigo)) == codigo
+    for fora in (-1, TOTAL_COMBINACOES):
+        with pytest.raises(RuntimeError):
+            decodificar_combinacao(fora)